@@ -0,0 +1,214 @@
+import os
+import threading
+
+import numpy as np
+
+VITALS = ('heart_rate', 'temperature', 'steps', 'bark_loudness')
+SIZES = ('Small', 'Medium', 'Large')
+# Smallest standard deviation a baseline may have, per vital, so a dog with
+# very steady readings doesn't flag every small change
+MIN_STD = np.array([3.0, 0.1, 500.0, 3.0])
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# Cohort index from size and age bracket (puppy < 1y, senior > 7y, adult,
+# as in client.py); unknown sizes share one extra cohort
+def cohort_codes(sizes, ages):
+    size_idx = np.fromiter((SIZES.index(s) if s in SIZES else len(SIZES) for s in sizes),
+                           dtype=np.intp, count=len(sizes))
+    ages = np.asarray(ages, dtype=np.float64)
+    bracket = np.where(ages < 1, 0, np.where(ages > 7, 1, 2))
+    return size_idx * 3 + bracket
+
+
+# Online vitals baselines for every collar, held as rows of NumPy arrays so a
+# batch of readings from thousands of collars is scored and folded into the
+# baselines with a few array operations.
+#
+# Each collar keeps an exponentially weighted mean/variance per vital. Until
+# it has `min_samples` readings it is compared against its cohort (size and
+# age bracket), whose running mean/variance is kept over all its collars and
+# seeds the baseline of new collars. A vital is anomalous when it is more than
+# `threshold` standard deviations from the baseline; outliers are clipped
+# before updating so they don't drag the baseline towards themselves.
+# Repeated readings from one collar in a batch are folded in with a
+# segmented scan rather than one pass per reading.
+class VitalsMonitor:
+    def __init__(self, alpha=0.05, threshold=3.5, min_samples=10, min_cohort_samples=30, capacity=1024):
+        self.alpha = alpha
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.min_cohort_samples = min_cohort_samples
+        self._lock = threading.Lock()
+        self._rows = {}
+        n_vitals = len(VITALS)
+        self.mean = np.zeros((capacity, n_vitals))
+        self.var = np.zeros((capacity, n_vitals))
+        self.count = np.zeros((capacity, n_vitals), dtype=np.int64)  # values seen per vital
+        n_cohorts = (len(SIZES) + 1) * 3
+        self.cohort_count = np.zeros((n_cohorts, n_vitals))
+        self.cohort_mean = np.zeros((n_cohorts, n_vitals))
+        self.cohort_m2 = np.zeros((n_cohorts, n_vitals))
+
+    @classmethod
+    def from_env(cls):
+        return cls(alpha=float(os.environ.get('PAWSENSE_ANOMALY_ALPHA', 0.05)),
+                   threshold=float(os.environ.get('PAWSENSE_ANOMALY_Z', 3.5)),
+                   min_samples=int(os.environ.get('PAWSENSE_ANOMALY_MIN_SAMPLES', 10)))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _row_indices(self, collar_ids):
+        rows = np.empty(len(collar_ids), dtype=np.intp)
+        for i, collar_id in enumerate(collar_ids):
+            row = self._rows.get(collar_id)
+            if row is None:
+                row = self._rows[collar_id] = len(self._rows)
+            rows[i] = row
+        if len(self._rows) > len(self.count):
+            capacity = max(len(self._rows), 2 * len(self.count))
+            for name in ('mean', 'var', 'count'):
+                old = getattr(self, name)
+                new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:len(old)] = old
+                setattr(self, name, new)
+        return rows
+
+    # Scores readings given as arrays: collar ids, cohort codes and a
+    # (n, len(VITALS)) float matrix with NaN for missing values. Returns
+    # (flags, z, expected) arrays of that shape, where flags[i, v] marks
+    # vital v of reading i as anomalous. Every reading of a batch is scored
+    # against the baselines as they were before the batch; the baselines
+    # then take in the batch's readings in order.
+    def score(self, collar_ids, cohorts, values):
+        values = np.asarray(values, dtype=np.float64)
+        with self._lock:
+            rows = self._row_indices(collar_ids)
+            present = np.isfinite(values)
+            x0 = np.where(present, values, 0.0)
+            cohort_n = self.cohort_count[cohorts]
+            cohort_mean = self.cohort_mean[cohorts]
+            cohort_var = np.divide(self.cohort_m2[cohorts], cohort_n, out=np.zeros_like(x0), where=cohort_n > 0)
+
+            # A collar's vital starts from its cohort's baseline, or else from
+            # the first value it reports; until then it stays unseeded
+            new = self.count[rows] == 0
+            if new.any():
+                seeded = cohort_n > 0
+                for v in np.flatnonzero(new.any(axis=0)):
+                    candidates = np.flatnonzero(new[:, v] & (seeded[:, v] | present[:, v]))
+                    seed_rows, first = np.unique(rows[candidates], return_index=True)
+                    first = candidates[first]
+                    self.mean[seed_rows, v] = np.where(seeded[first, v], cohort_mean[first, v], x0[first, v])
+                    self.var[seed_rows, v] = np.where(seeded[first, v], cohort_var[first, v], 0.0)
+
+            own = self.count[rows] >= self.min_samples
+            mean = np.where(own, self.mean[rows], cohort_mean)
+            std = np.maximum(np.sqrt(np.where(own, self.var[rows], cohort_var)), MIN_STD)
+            ready = own | (cohort_n >= self.min_cohort_samples)
+            z = np.where(present, (x0 - mean) / std, 0.0)
+            flags = present & ready & (np.abs(z) > self.threshold)
+
+            # Outliers are clipped before they reach the baselines, once there
+            # is a baseline to judge them by
+            bound = self.threshold * std
+            clipped = np.where(present & ready, np.clip(x0, mean - bound, mean + bound), x0)
+            self._update_collars(rows, clipped, present)
+            self._update_cohorts(cohorts, x0, present)
+        return flags, z, mean
+
+    # EWMA update of the collars' baselines with each reading in turn,
+    #     mean_i = d_i * mean_(i-1) + alpha * x_i
+    #     var_i  = d_i * var_(i-1) + (1 - alpha) * alpha * (x_i - mean_(i-1)) ** 2
+    # with d_i = 1 - alpha (1 and no update for missing values). Both are
+    # linear recurrences, so a collar's readings are folded in with
+    # cumulative sums: with L_i = sum of log d up to i,
+    #     mean_i = exp(L_i) * (mean_0 + sum_j<=i exp(-L_j) * alpha * x_j)
+    # Readings are sorted by collar and processed SCAN_BLOCK per collar at a
+    # time so exp(-L) stays in range.
+    SCAN_BLOCK = 512
+
+    def _update_collars(self, rows, x, present):
+        if len(rows) == 1 or len(np.unique(rows)) == len(rows):
+            # One reading per collar: a single EWMA step
+            mean, var = self.mean[rows], self.var[rows]
+            delta = x - mean
+            self.mean[rows] = np.where(present, mean + self.alpha * delta, mean)
+            self.var[rows] = np.where(present, (1 - self.alpha) * (var + self.alpha * delta ** 2), var)
+            self.count[rows] += present
+            return
+        order = np.argsort(rows, kind='stable')
+        rows, x, present = rows[order], x[order], present[order]
+        first = np.concatenate(([True], rows[1:] != rows[:-1]))
+        group_start = np.maximum.accumulate(np.where(first, np.arange(len(rows)), 0))
+        rank = np.arange(len(rows)) - group_start
+        for block in range(0, int(rank.max()) + 1, self.SCAN_BLOCK):
+            selected = np.flatnonzero((rank >= block) & (rank < block + self.SCAN_BLOCK))
+            self._scan(rows[selected], x[selected], present[selected])
+        np.add.at(self.count, rows, present.astype(np.int64))
+
+    def _scan(self, rows, x, present):
+        first = np.concatenate(([True], rows[1:] != rows[:-1]))
+        last = np.concatenate((rows[1:] != rows[:-1], [True]))
+        starts = np.flatnonzero(first)
+        group = np.cumsum(first) - 1
+
+        def segmented_cumsum(values):
+            total = np.cumsum(values, axis=0)
+            before = total[starts] - values[starts]
+            return total - before[group]
+
+        alpha = self.alpha
+        log_decay = np.where(present, np.log1p(-alpha), 0.0)
+        L = segmented_cumsum(log_decay)
+        mean0 = self.mean[rows[starts]][group]
+        var0 = self.var[rows[starts]][group]
+        mean = np.exp(L) * (mean0 + segmented_cumsum(np.exp(-L) * np.where(present, alpha * x, 0.0)))
+        previous = np.where(first[:, None], mean0, np.roll(mean, 1, axis=0))
+        spread = np.where(present, (1 - alpha) * alpha * (x - previous) ** 2, 0.0)
+        var = np.exp(L) * (var0 + segmented_cumsum(np.exp(-L) * spread))
+        self.mean[rows[last]] = mean[last]
+        self.var[rows[last]] = var[last]
+
+    # Merges readings into their cohorts' running mean/variance with Chan et
+    # al.'s parallel update: one bincount per statistic over (cohort, vital)
+    # cells. The result doesn't depend on the order of the readings.
+    def _update_cohorts(self, cohorts, x, present):
+        n_cells = self.cohort_count.size
+        cells = (cohorts[:, None] * x.shape[1] + np.arange(x.shape[1]))[present]
+        xv = x[present]
+        n_b = np.bincount(cells, minlength=n_cells).astype(np.float64)
+        mean_b = np.divide(np.bincount(cells, xv, n_cells), n_b, out=np.zeros(n_cells), where=n_b > 0)
+        m2_b = np.bincount(cells, (xv - mean_b[cells]) ** 2, n_cells)
+        n_a, mean_a = self.cohort_count.ravel(), self.cohort_mean.ravel()
+        total = n_a + n_b
+        delta = mean_b - mean_a
+        safe = np.maximum(total, 1)
+        self.cohort_m2 += (m2_b + delta ** 2 * n_a * n_b / safe).reshape(self.cohort_m2.shape)
+        self.cohort_mean += (delta * n_b / safe).reshape(self.cohort_mean.shape)
+        self.cohort_count += n_b.reshape(self.cohort_count.shape)
+
+    # Checks reading dicts, each from collar_ids[i]. Returns one list of
+    # alerts per reading (empty when nothing is out of the ordinary).
+    def check(self, collar_ids, readings):
+        n = len(readings)
+        if not n:
+            return []
+        cohorts = cohort_codes([r.get('size') for r in readings], [_number(r.get('age')) for r in readings])
+        values = np.fromiter((_number(r.get(v)) for r in readings for v in VITALS),
+                             dtype=np.float64, count=n * len(VITALS)).reshape(n, len(VITALS))
+        flags, z, expected = self.score(collar_ids, cohorts, values)
+        alerts = [[] for _ in range(n)]
+        for i, v in zip(*np.nonzero(flags)):
+            alerts[i].append({"vital": VITALS[v],
+                              "value": float(values[i, v]),
+                              "expected": round(float(expected[i, v]), 2),
+                              "z": round(float(z[i, v]), 2)})
+        return alerts
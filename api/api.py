@@ -1,117 +1,462 @@
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
-from behaviour_prediction.model import predict_day
+from behaviour_prediction.model import predict_day, record_activity, known_pet, forecast
 from client import retrieve_client_data
 
-from flask import Flask, request, jsonify
-import joblib
+from flask import Flask, Response, g, request, jsonify
 import numpy as np
-import pandas as pd
 from client import retrieve_client_data
+from registry import ModelRegistry, ModelLoadError
+from streaming import PredictionBroker, stream_events, iter_ndjson_batches
+from translation import TranslationEngine
+from history import HistoryStore, telemetry_values
+from anomaly import VitalsMonitor
+from geo import GeoIndex, DEFAULT_CELL_DEGREES
+from metrics import registry, stage_seconds, errors_total, emotions_total, anomalies_total, requests_total, request_seconds, log_sampled
+from time import perf_counter
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import hmac
+import logging
+import math
+from functools import wraps
 
 import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
-sibling_dir = os.path.join(current_dir, '..', 'machine-learning')
+sibling_dir = os.environ.get('PAWSENSE_MODEL_DIR', os.path.join(current_dir, '..', 'machine-learning'))
 
-# Load model + encoders
-model = joblib.load(os.path.join(sibling_dir, 'model.joblib'))
-label_encoders = joblib.load(os.path.join(sibling_dir, 'label_encoders.joblib'))
-target_le = joblib.load(os.path.join(sibling_dir, 'target_le.joblib'))
+# Load model + encoders; new artifacts in sibling_dir are picked up while running
+model_registry = ModelRegistry.from_env(sibling_dir)
+emotion_labels = model_registry.emotion_labels
+translation_engine = TranslationEngine()
+# Recent readings and rolling aggregates per collar
+history_store = HistoryStore(emotion_labels,
+                             capacity=int(os.environ.get('PAWSENSE_HISTORY_SIZE', 256)),
+                             windows=[int(w) for w in os.environ.get('PAWSENSE_HISTORY_WINDOWS', '60,600,3600').split(',')])
+# Per-collar vitals baselines; readings far outside them come back as alerts
+vitals_monitor = VitalsMonitor.from_env()
+# Grid index of collar positions, for heatmaps and nearby/bbox queries
+geo_index = GeoIndex(float(os.environ.get('PAWSENSE_GEO_CELL_DEGREES', DEFAULT_CELL_DEGREES)))
+# Token for the admin endpoints (model reload/rollback, translation reload),
+# sent as "Authorization: Bearer <token>"; they are disabled while it is unset
+admin_token = os.environ.get('PAWSENSE_ADMIN_TOKEN', '')
+# Longest a /data request waits for its batched prediction, in seconds
+predict_timeout = float(os.environ.get('PAWSENSE_PREDICT_TIMEOUT', 5))
 
-categorical_features = ['size', 'tail_position', 'tail_stiffness', 'wag_direction']
+logging.basicConfig(level=os.environ.get('PAWSENSE_LOG_LEVEL', 'INFO'), format='%(asctime)s %(name)s %(message)s')
 
 app = Flask(__name__)
 CORS(app)
+broker = PredictionBroker()
+ready = False
+
+# Runs one prediction end to end so the first real request doesn't pay for
+# lazy initialisation, then marks the app ready
+def warm_up():
+    global ready
+    bundle = model_registry.current()
+    bundle.scheduler.predict(bundle.feature_encoder.encode(bundle.sample_reading()), timeout=predict_timeout)
+    predict_day()
+    ready = True
+
+# Readiness probe: 503 until warm_up() has completed
+@app.route('/ready', methods=['GET'])
+def readiness():
+    if not ready:
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
 
 @app.route('/predict', methods=["GET"])
 def predict():
-    listOfPredictions = predict_day()
+    pet = request.args.get('pet')
+    weekday = request.args.get('weekday')
+    if weekday is not None:
+        if not weekday.isdigit() or int(weekday) > 6:
+            return jsonify({"error": "weekday must be 0 (Monday) to 6 (Sunday)"}), 400
+        weekday = int(weekday)
+    if pet is not None and not known_pet(pet):
+        return jsonify({"error": f"Unknown pet: {pet}"}), 404
+    listOfPredictions = predict_day(pet, weekday)
     return jsonify({
         'predictionList': listOfPredictions
     })
 
-# Predicts the current dog emotion based on client data
+# Activity probabilities at ?at= (ISO datetime, default now) and the next
+# due time of each activity, for ?pet= or the average pet
+@app.route('/forecast', methods=['GET'])
+def activity_forecast():
+    pet = request.args.get('pet')
+    try:
+        result = forecast(pet, request.args.get('at'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except KeyError:
+        return jsonify({"error": f"Unknown pet: {pet}"}), 404
+    return jsonify(result)
+
+# Logs an activity event ({"activity": ..., "start_time": ISO datetime,
+# optionally "pet_name": ...}) so /predict reflects it immediately
+@app.route('/activity', methods=['POST'])
+def log_activity():
+    event = request.get_json(silent=True)
+    if not isinstance(event, dict) or not event.get('activity') or not event.get('start_time'):
+        return jsonify({"error": "Expected a JSON object with 'activity' and 'start_time'"}), 400
+    try:
+        record_activity(event['activity'], event['start_time'], event.get('pet_name'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"recorded": event}), 201
+
+# Predicts the current dog emotion based on client data, with the model's
+# confidence in it (and every emotion's probability with ?probabilities=1)
 @app.route('/data', methods=['GET'])
 def get_data():
     try:
+        start = perf_counter()
         data = retrieve_client_data()
-        new_data = pd.DataFrame([data])
-        print("Received data for emotion prediction:", new_data)
+        acquired = perf_counter()
 
-        activity = new_data['activity'].values[0]
-        print(f"Activity: {activity}")
-        new_data.drop(columns=['context', 'activity', 'steps', 'latitude', 'longitude', 'temperature', 'calories'], inplace=True, errors='ignore')
+        activity = data.get('activity')
+        bundle = model_registry.current()
+        g.model_version = bundle.version
 
         # Encode categorical features
-        for col in categorical_features:
-            new_data[col] = label_encoders[col].transform(new_data[col])
-        print("Encoded data for prediction:", new_data)
+        features = bundle.feature_encoder.encode(data)
+        encoded = perf_counter()
 
         # Predict
-        predicted_label_num = model.predict(new_data)[0]
-        predicted_emotion = target_le.inverse_transform([predicted_label_num])[0]
-        translation = predict_bark_translation(predicted_emotion, activity)
-        print(f"Predicted emotion: {predicted_emotion}, Translation: {translation}")
+        probabilities = bundle.scheduler.predict(features, timeout=predict_timeout)
+        predicted = perf_counter()
+        predicted_label_num = int(probabilities.argmax())
+        predicted_emotion = bundle.emotion_labels[predicted_label_num]
+        decoded = perf_counter()
+        translation = predict_bark_translation(predicted_emotion, activity, data.get('context'),
+                                               request.args.get('locale'))
+        translated = perf_counter()
+        collar_id = request.args.get('collar', 'default')
+        alerts = check_vitals([collar_id], [data])[0]
+        geo_index.record(collar_id, data)
+        checked = perf_counter()
 
-        print(f"Predicted dog emotion: {predicted_emotion}")
-        return jsonify({"clientData":data,
-                        "predicted_emotion": predicted_emotion,
-                        "bark_translation": translation})
+        stage_seconds.observe(acquired - start, 'single', 'acquire')
+        stage_seconds.observe(encoded - acquired, 'single', 'encode')
+        stage_seconds.observe(predicted - encoded, 'single', 'predict')
+        stage_seconds.observe(decoded - predicted, 'single', 'inverse_transform')
+        stage_seconds.observe(translated - decoded, 'single', 'translate')
+        stage_seconds.observe(checked - translated, 'single', 'anomaly')
+        emotions_total.inc(predicted_emotion)
+        history_store.record(collar_id, data, predicted_emotion)
+        log_sampled('prediction', activity=activity, emotion=predicted_emotion,
+                    seconds=round(translated - start, 6))
+        response = {"clientData":data,
+                    "predicted_emotion": predicted_emotion,
+                    "confidence": round(float(probabilities[predicted_label_num]), 4),
+                    "bark_translation": translation,
+                    "alerts": alerts,
+                    "model_version": bundle.version}
+        if request.args.get('probabilities'):
+            response["probabilities"] = label_probabilities(bundle.emotion_labels, probabilities)
+        return jsonify(response)
+
+    except FutureTimeoutError:
+        errors_total.inc('single', 'TimeoutError')
+        log_sampled('prediction_error', type='TimeoutError', error='prediction timed out')
+        return jsonify({"error": f"Prediction timed out after {predict_timeout}s"}), 503
 
     except Exception as e:
+        errors_total.inc('single', type(e).__name__)
+        log_sampled('prediction_error', type=type(e).__name__, error=str(e))
         return jsonify({"error": str(e)}), 400
 
-def predict_bark_translation(emotion, activity):
-    dog_sentences = {
-    ("Neutral", "Playing"): "I'm just playing like usual.",
-    ("Excited", "Playing"): "Yay! Playing is the best!",
-    ("Sad", "Playing"): "I don't feel like playing right now.",
-    ("Angry", "Playing"): "Stop bothering me while I play!",
-    ("Hungry", "Playing"): "I want to play, but my tummy is rumbling.",
-    ("Scared", "Playing"): "I don't want to play anymore, I'm scared.",
-    ("Alert", "Playing"): "I'm playing but staying alert around here.",
-
-    ("Neutral", "Potty"): "Time to do my business.",
-    ("Excited", "Potty"): "Potty time, yay!",
-    ("Sad", "Potty"): "I don't feel good, maybe I need to potty.",
-    ("Angry", "Potty"): "Why are you rushing me to potty?",
-    ("Hungry", "Potty"): "I want food but I gotta potty first.",
-    ("Scared", "Potty"): "Potty time but something's making me nervous.",
-    ("Alert", "Potty"): "Potty but I'm watching out for anything strange.",
-
-    ("Neutral", "Medication"): "Taking my medicine like a good pup.",
-    ("Excited", "Medication"): "Medicine time! Hopefully it tastes good!",
-    ("Sad", "Medication"): "I don't like taking medicine.",
-    ("Angry", "Medication"): "No! I don't want medicine!",
-    ("Hungry", "Medication"): "I’m hungry but have to take this first.",
-    ("Scared", "Medication"): "Medicine time scares me a bit.",
-    ("Alert", "Medication"): "I'm alert while getting my medicine.",
-
-    ("Neutral", "Sleeping"): "Just going to take a nap.",
-    ("Excited", "Sleeping"): "I’m excited for bedtime!",
-    ("Sad", "Sleeping"): "I feel lonely, time to sleep.",
-    ("Angry", "Sleeping"): "I don't want to sleep now!",
-    ("Hungry", "Sleeping"): "I’m hungry but sleepy too.",
-    ("Scared", "Sleeping"): "Sleeping but I’m still scared.",
-    ("Alert", "Sleeping"): "I’m resting but staying alert.",
-
-    ("Neutral", "Feeding"): "Time to eat my food.",
-    ("Excited", "Feeding"): "Yummy! Food time!",
-    ("Sad", "Feeding"): "I don’t feel like eating.",
-    ("Angry", "Feeding"): "Why is my food late?",
-    ("Hungry", "Feeding"): "I’m starving, finally food!",
-    ("Scared", "Feeding"): "Eating but a bit nervous.",
-    ("Alert", "Feeding"): "Eating but I’m watching around.",
-
-    ("Neutral", "Exercising"): "Let’s get some exercise.",
-    ("Excited", "Exercising"): "I love exercising!",
-    ("Sad", "Exercising"): "I don’t feel like moving today.",
-    ("Angry", "Exercising"): "Exercise again? Not happy about this!",
-    ("Hungry", "Exercising"): "I want food but I have to exercise.",
-    ("Scared", "Exercising"): "Exercising but I’m scared of the noises.",
-    ("Alert", "Exercising"): "Exercising and staying alert.",
-}
-    return dog_sentences.get((emotion, activity), "I don't know what to say.")
+@app.before_request
+def start_timer():
+    g.request_start = perf_counter()
+
+@app.after_request
+def record_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    requests_total.inc(endpoint, str(response.status_code))
+    start = g.get('request_start')
+    if start is not None:
+        request_seconds.observe(perf_counter() - start, endpoint)
+    version = g.get('model_version')
+    if version is not None:
+        response.headers['X-Model-Version'] = version
+    return response
+
+# Rolling aggregates (and with ?limit=N the last N readings) for a collar
+@app.route('/history', methods=['GET'])
+def history():
+    collar_id = request.args.get('collar', 'default')
+    limit = request.args.get('limit', '0')
+    if not limit.isdigit():
+        return jsonify({"error": "limit must be a non-negative integer"}), 400
+    if collar_id not in history_store:
+        return jsonify({"error": f"No history for collar: {collar_id}"}), 404
+    return jsonify(history_store.summary(collar_id, int(limit)))
+
+# Reads the named float query parameters; returns (values, error response).
+# Values must be finite, and *lat / *lon parameters valid coordinates.
+def float_args(*names, **defaults):
+    values = []
+    for name in names:
+        value = request.args.get(name, defaults.get(name))
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None, (jsonify({"error": f"{name} must be a number"}), 400)
+        if not math.isfinite(number):
+            return None, (jsonify({"error": f"{name} must be a finite number"}), 400)
+        limit = 90 if name.endswith('lat') else 180 if name.endswith('lon') else None
+        if limit is not None and abs(number) > limit:
+            return None, (jsonify({"error": f"{name} must be between -{limit} and {limit}"}), 400)
+        values.append(number)
+    return values, None
+
+# Collars last seen within ?radius= metres (default 1000) of ?lat=&lon=
+@app.route('/geo/nearby', methods=['GET'])
+def geo_nearby():
+    values, error = float_args('lat', 'lon', 'radius', radius=1000)
+    if error:
+        return error
+    lat, lon, radius = values
+    collars = geo_index.within_radius(lat, lon, radius)
+    return jsonify({"collars": collars, "count": len(collars)})
+
+# Collars last seen inside the box, and fleet reading counts per grid cell
+@app.route('/geo/bbox', methods=['GET'])
+def geo_bbox():
+    values, error = float_args('min_lat', 'min_lon', 'max_lat', 'max_lon')
+    if error:
+        return error
+    min_lat, min_lon, max_lat, max_lon = values
+    if min_lat > max_lat or min_lon > max_lon:
+        return jsonify({"error": "min_lat/min_lon must not exceed max_lat/max_lon"}), 400
+    collars = geo_index.within_bbox(min_lat, min_lon, max_lat, max_lon)
+    return jsonify({"collars": collars,
+                    "count": len(collars),
+                    "cell_degrees": geo_index.cell_degrees,
+                    "cells": geo_index.density(min_lat, min_lon, max_lat, max_lon)})
+
+# Where a collar's dog spends its time: reading counts per grid cell
+@app.route('/heatmap', methods=['GET'])
+def heatmap():
+    collar_id = request.args.get('collar', 'default')
+    if collar_id not in geo_index:
+        return jsonify({"error": f"No positions for collar: {collar_id}"}), 404
+    return jsonify({"collar": collar_id,
+                    "cell_degrees": geo_index.cell_degrees,
+                    "cells": geo_index.heatmap(collar_id)})
+
+# Guards the admin endpoints with admin_token: 403 when no token is
+# configured, 401 when the request doesn't carry it
+def admin_only(view):
+    @wraps(view)
+    def guarded(*args, **kwargs):
+        if not admin_token:
+            return jsonify({"error": "Admin endpoints are disabled; set PAWSENSE_ADMIN_TOKEN"}), 403
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), admin_token.encode()):
+            return jsonify({"error": "Missing or invalid admin token"}), 401
+        return view(*args, **kwargs)
+    return guarded
+
+# The model versions being served. POST /model/reload loads the artifacts
+# now instead of waiting for the file watcher; /model/rollback switches back
+# to the previous version. Both need the admin token and act on the worker
+# that receives them only.
+@app.route('/model', methods=['GET'])
+def model_info():
+    model_registry.current()
+    return jsonify(model_registry.describe())
+
+@app.route('/model/reload', methods=['POST'])
+@admin_only
+def reload_model():
+    try:
+        bundle = model_registry.reload()
+    except ModelLoadError as e:
+        return jsonify({"error": str(e), "version": model_registry.current().version}), 500
+    return jsonify(bundle.describe())
+
+@app.route('/model/rollback', methods=['POST'])
+@admin_only
+def rollback_model():
+    try:
+        bundle = model_registry.rollback()
+    except ModelLoadError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(bundle.describe())
+
+# Reloads the phrase files (they are also picked up automatically when they
+# change); needs the admin token
+@app.route('/translations/reload', methods=['POST'])
+@admin_only
+def reload_translations():
+    try:
+        book = translation_engine.reload()
+    except (OSError, ValueError, KeyError) as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"locales": book.locales, "activities": book.activities})
+
+# Prometheus metrics: per-stage latency histograms, request and error counts
+# and predicted emotion counts
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+# Queue depth and batch-size statistics of the inference scheduler
+@app.route('/scheduler/stats', methods=['GET'])
+def scheduler_stats():
+    return jsonify(model_registry.current().scheduler.stats())
+
+# Predicts dog emotions for a burst of collar readings in a single model call
+@app.route('/data/batch', methods=['POST'])
+def get_data_batch():
+    payload = request.get_json(silent=True)
+    readings = payload.get('readings') if isinstance(payload, dict) else payload
+    if not isinstance(readings, list) or not readings:
+        return jsonify({"error": "Expected a non-empty list of readings"}), 400
+
+    results = predict_readings(readings, request.args.get('locale'), request.args.get('collar', 'default'),
+                               probabilities=bool(request.args.get('probabilities')))
+    return jsonify({"results": results,
+                    "count": len(readings),
+                    "errors": sum(1 for r in results if "error" in r)})
+
+# Encodes and predicts a list of readings with a single model call.
+# Returns one result dict per reading, in order.
+# Readings are added to the history (and vitals baseline) of their
+# "collar_id", or of `collar_id`. Results carry the confidence of the
+# predicted emotion (every emotion's with probabilities=True) and any
+# vitals "alerts".
+def predict_readings(readings, locale=None, collar_id='default', probabilities=False):
+    results = [None] * len(readings)
+    start = perf_counter()
+    bundle = model_registry.current()
+    g.model_version = bundle.version
+    collar_ids = [reading.get('collar_id', collar_id) if isinstance(reading, dict) else None for reading in readings]
+    features, valid_rows, row_errors = bundle.feature_encoder.encode_many(readings)
+    encoded = perf_counter()
+    stage_seconds.observe(encoded - start, 'batch', 'encode')
+    for i, message in row_errors.items():
+        results[i] = {"error": message}
+    if row_errors:
+        errors_total.inc('batch', 'EncodingError', amount=len(row_errors))
+
+    # Fields the model doesn't use but the history and vitals need fail
+    # their own row (and keep it out of the vitals baselines)
+    invalid = set()
+    for i, reading in enumerate(readings):
+        message = reading_error(reading, collar_ids[i]) if isinstance(reading, dict) else None
+        if message is not None:
+            invalid.add(i)
+            if results[i] is None:
+                results[i] = {"error": message}
+                errors_total.inc('batch', 'InvalidReading')
+    if invalid:
+        keep = [row for row, i in enumerate(valid_rows.tolist()) if i not in invalid]
+        features, valid_rows = features[keep], valid_rows[keep]
+
+    if len(valid_rows):
+        try:
+            class_probabilities = bundle.model.predict_proba(features)
+        except Exception as e:
+            errors_total.inc('batch', type(e).__name__, amount=len(valid_rows))
+            for i in valid_rows:
+                results[i] = {"error": str(e)}
+        else:
+            predicted = perf_counter()
+            predicted_label_nums = class_probabilities.argmax(axis=1)
+            confidences = class_probabilities[np.arange(len(predicted_label_nums)), predicted_label_nums].tolist()
+            predicted_emotions = [bundle.emotion_labels[n] for n in predicted_label_nums]
+            decoded = perf_counter()
+            valid_readings = [readings[i] for i in valid_rows]
+            translations = translation_engine.translate_many(
+                predicted_emotions, [r.get('activity') for r in valid_readings],
+                [r.get('context') for r in valid_readings], locale)
+            for row, (i, predicted_emotion, translation) in enumerate(zip(valid_rows, predicted_emotions, translations)):
+                results[i] = {"predicted_emotion": predicted_emotion,
+                              "confidence": round(confidences[row], 4),
+                              "bark_translation": translation,
+                              "model_version": bundle.version}
+                if probabilities:
+                    results[i]["probabilities"] = label_probabilities(bundle.emotion_labels, class_probabilities[row])
+                emotions_total.inc(predicted_emotion)
+                history_store.record(collar_ids[i], readings[i], predicted_emotion)
+            translated = perf_counter()
+            stage_seconds.observe(predicted - encoded, 'batch', 'predict')
+            stage_seconds.observe(decoded - predicted, 'batch', 'inverse_transform')
+            stage_seconds.observe(translated - decoded, 'batch', 'translate')
+
+    # Vitals are checked for every reading the model rejected as well, but
+    # not for readings with unusable telemetry or collar ids
+    checked = perf_counter()
+    positions = [i for i, reading in enumerate(readings)
+                 if isinstance(reading, dict) and isinstance(collar_ids[i], str) and i not in invalid]
+    ids = [collar_ids[i] for i in positions]
+    for i, alerts in zip(positions, check_vitals(ids, [readings[i] for i in positions])):
+        results[i]["alerts"] = alerts
+    geo_index.record_many(ids, [readings[i] for i in positions])
+    stage_seconds.observe(perf_counter() - checked, 'batch', 'anomaly')
+    return results
+
+# Why a reading the model accepted can't be stored, or None
+def reading_error(reading, collar_id):
+    if not isinstance(collar_id, str):
+        return f"collar_id must be a string, got {collar_id!r}"
+    try:
+        telemetry_values(reading)
+    except ValueError as e:
+        return str(e)
+    return None
+
+def label_probabilities(labels, probabilities):
+    return {label: round(p, 4) for label, p in zip(labels, probabilities.tolist())}
+
+def check_vitals(collar_ids, readings):
+    alerts = vitals_monitor.check(collar_ids, readings)
+    for reading_alerts in alerts:
+        for alert in reading_alerts:
+            anomalies_total.inc(alert["vital"])
+    return alerts
+
+# Pushes predictions for a collar to the client as they are ingested.
+# ?format=ndjson switches from Server-Sent Events to newline-delimited JSON.
+@app.route('/stream', methods=['GET'])
+def stream():
+    collar_id = request.args.get('collar', 'default')
+    fmt = request.args.get('format', 'sse')
+    if fmt not in ('sse', 'ndjson'):
+        return jsonify({"error": "format must be 'sse' or 'ndjson'"}), 400
+    mimetype = 'text/event-stream' if fmt == 'sse' else 'application/x-ndjson'
+    return Response(stream_events(broker, collar_id, fmt), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Accepts a continuous newline-delimited JSON stream of readings for a collar.
+# Readings are predicted in small batches as they arrive and every result is
+# published once to all of the collar's subscribers.
+@app.route('/ingest', methods=['POST'])
+def ingest():
+    collar_id = request.args.get('collar', 'default')
+    received = predicted = failed = 0
+    for readings, parse_errors in iter_ndjson_batches(request.stream):
+        events = [{"collar": collar_id, "clientData": reading, **result}
+                  for reading, result in zip(readings, predict_readings(readings, collar_id=collar_id))]
+        events.extend({"collar": collar_id, **error} for error in parse_errors)
+        received += len(readings) + len(parse_errors)
+        failed += sum(1 for event in events if "error" in event)
+        predicted = received - failed
+        broker.publish(collar_id, events)
+    return jsonify({"collar": collar_id,
+                    "received": received,
+                    "predicted": predicted,
+                    "errors": failed,
+                    "subscribers": broker.subscriber_count(collar_id)})
+
+def predict_bark_translation(emotion, activity, context=None, locale=None):
+    return translation_engine.translate(emotion, activity, context, locale)
 
+# Development server; use serve.py (or asgi.py) in production
 if __name__ == '__main__':
+    warm_up()
     app.run(host='0.0.0.0', port=5000, debug=True)
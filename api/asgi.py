@@ -0,0 +1,167 @@
+# ASGI entry point: uvicorn asgi:app
+#
+# As with serve.py, the live state (streams, history, vitals baselines,
+# positions, metrics) is per process, so run a single uvicorn worker unless
+# the traffic is stateless prediction only.
+#
+# Runs the Flask app behind an asyncio server. Each request is handled by the
+# WSGI app in a bounded thread pool (PAWSENSE_INFERENCE_THREADS), so a burst
+# of requests queues on the event loop instead of spawning a thread per
+# connection. Response bodies are iterated in a separate pool
+# (PAWSENSE_STREAM_THREADS), since a long-lived /stream response holds its
+# thread while it waits for events; when the client disconnects the response
+# is closed, which ends the stream within one keep-alive interval. The
+# request body is passed to the app as it arrives, so /ingest processes
+# readings while the client is still sending them.
+import asyncio
+import io
+import os
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import api
+
+api.warm_up()
+
+executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PAWSENSE_INFERENCE_THREADS', os.cpu_count() or 4)),
+                              thread_name_prefix='inference')
+stream_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('PAWSENSE_STREAM_THREADS', 256)),
+                                     thread_name_prefix='stream')
+
+
+# wsgi.input fed from the ASGI receive channel: the event loop pushes body
+# chunks in, the app's thread blocks in read() until one arrives
+class RequestBody(io.RawIOBase):
+    def __init__(self):
+        self._chunks = queue.SimpleQueue()
+        self._buffer = b''
+        self._finished = False
+
+    def feed(self, chunk):
+        if chunk:
+            self._chunks.put(chunk)
+
+    def finish(self):
+        self._chunks.put(None)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer and not self._finished:
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._finished = True
+            else:
+                self._buffer = chunk
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def build_environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BufferedReader(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # A chunked body has no length; the stream ends when the client is done
+    environ['wsgi.input_terminated'] = 'CONTENT_LENGTH' not in environ
+    return environ
+
+
+# Reads the ASGI receive channel for the whole request: body chunks go to
+# `body` as they arrive, and `disconnected` is set when the client goes away
+async def receive_body(receive, body, disconnected):
+    finished = False
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            if not finished:
+                body.finish()
+            disconnected.set()
+            return
+        if message['type'] == 'http.request' and not finished:
+            body.feed(message.get('body', b''))
+            if not message.get('more_body'):
+                body.finish()
+                finished = True
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                executor.shutdown(wait=False)
+                stream_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    loop = asyncio.get_running_loop()
+    body = RequestBody()
+    disconnected = asyncio.Event()
+    receiver = asyncio.create_task(receive_body(receive, body, disconnected))
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'] = int(status.split(' ', 1)[0])
+        response['headers'] = [(k.lower().encode('latin1'), v.encode('latin1')) for k, v in headers]
+
+    result = None
+    try:
+        result = await loop.run_in_executor(executor, api.app, build_environ(scope, body), start_response)
+        if disconnected.is_set():
+            return
+        chunks = iter(result)
+        gone = asyncio.ensure_future(disconnected.wait())
+        await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+        try:
+            while True:
+                pending = loop.run_in_executor(stream_executor, next, chunks, None)
+                done, _ = await asyncio.wait({pending, gone}, return_when=asyncio.FIRST_COMPLETED)
+                if pending not in done:
+                    # The client left while the app waits for its next chunk
+                    # (e.g. a /stream keep-alive); close once that returns
+                    await pending
+                    return
+                chunk = pending.result()
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            gone.cancel()
+    finally:
+        receiver.cancel()
+        if result is not None and hasattr(result, 'close'):
+            await loop.run_in_executor(stream_executor, result.close)
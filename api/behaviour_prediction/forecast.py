@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+# An activity is "due" once the expected number of starts since t reaches this
+DUE_THRESHOLD = 0.5
+# Store files the tables are built from
+SIGNATURE_FILES = ('meta.json', 'activity.npy', 'start_epoch.npy', 'duration_minutes.npy')
+
+
+# Minute of the week (Monday 00:00 = 0) of epoch seconds; 1970-01-01 was a Thursday
+def minute_of_week(start_epoch):
+    start_epoch = np.asarray(start_epoch, dtype=np.int64)
+    weekday = (start_epoch // 86400 + 3) % 7
+    return weekday * MINUTES_PER_DAY + (start_epoch % 86400) // 60
+
+
+# Per-activity weekly tables built from activity rows (activity code, start
+# epoch, duration in minutes):
+#   occupancy[a, m]  rows of activity a in progress at minute-of-week m
+#   starts[a, m]     rows of activity a starting at m
+#   days[w]          pet-days observed on weekday w
+#   due[a, m]        minutes from m until activity a is next due (-1: never)
+# Intervals are painted with a difference array: +1 at the start minute and
+# -1 after the end, one bincount for all rows, then a cumulative sum along the
+# week. Intervals running past Sunday midnight wrap to Monday.
+class ForecastTables:
+    def __init__(self, activities, occupancy, starts, days):
+        self.activities = list(activities)
+        self.occupancy = occupancy
+        self.starts = starts
+        self.days = days
+        self.due = self._due_minutes()
+
+    @classmethod
+    def build(cls, activities, activity_codes, start_epoch, duration_minutes, pet_codes=None):
+        n = len(activities)
+        codes = np.asarray(activity_codes, dtype=np.int64)
+        start = minute_of_week(start_epoch)
+        duration = np.maximum(np.asarray(duration_minutes, dtype=np.int64), 1)
+
+        # Whole weeks cover every minute; the remainder is one interval that
+        # may wrap past the end of the week
+        full_weeks = np.bincount(codes, weights=duration // MINUTES_PER_WEEK, minlength=n)
+        end = start + duration % MINUTES_PER_WEEK
+        wraps = end > MINUTES_PER_WEEK
+        width = MINUTES_PER_WEEK + 1
+        index = np.concatenate([codes * width + start,
+                                codes * width + np.where(wraps, MINUTES_PER_WEEK, end),
+                                codes[wraps] * width,
+                                codes[wraps] * width + end[wraps] - MINUTES_PER_WEEK])
+        weight = np.concatenate([np.ones(len(codes)), -np.ones(len(codes)),
+                                 np.ones(wraps.sum()), -np.ones(wraps.sum())])
+        diff = np.bincount(index, weights=weight, minlength=n * width).reshape(n, width)
+        occupancy = np.cumsum(diff[:, :MINUTES_PER_WEEK], axis=1) + full_weeks[:, None]
+
+        starts = np.bincount(codes * MINUTES_PER_WEEK + start, minlength=n * MINUTES_PER_WEEK)
+        starts = starts.reshape(n, MINUTES_PER_WEEK)
+
+        day = np.asarray(start_epoch, dtype=np.int64) // 86400
+        pet_codes = np.zeros(len(day), dtype=np.int64) if pet_codes is None else np.asarray(pet_codes, dtype=np.int64)
+        pet_days = np.unique(pet_codes * (1 << 32) + day)
+        days = np.bincount((pet_days % (1 << 32) + 3) % 7, minlength=7)
+        return cls(activities, occupancy.astype(np.int32), starts.astype(np.int32), days.astype(np.int64))
+
+    @classmethod
+    def from_store(cls, store, pet=None):
+        activity = store.columns['activity']
+        epoch = store.columns['start_epoch']
+        duration = store.columns['duration_minutes']
+        if pet is not None:
+            start, end = store.row_range(pet)
+            return cls.build(store.activities, activity[start:end], epoch[start:end], duration[start:end])
+        bounds = np.array([store.offsets[p][7] - store.offsets[p][0] for p in store.pets], dtype=np.int64)
+        # Rows are sorted by pet, in the order of store.pets
+        pet_codes = np.repeat(np.arange(len(bounds)), bounds)
+        return cls.build(store.activities, activity, epoch, duration, pet_codes)
+
+    # Expected starts per observed day, cumulated over two weeks so the
+    # search for the next due time can run past the end of the week
+    def _due_minutes(self):
+        weekday_days = np.maximum(np.repeat(self.days, MINUTES_PER_DAY), 1)
+        rate = self.starts / weekday_days
+        cumulative = np.concatenate([np.zeros((len(rate), 1)), np.cumsum(np.tile(rate, 2), axis=1)], axis=1)
+        minutes = np.arange(MINUTES_PER_WEEK)
+        due = np.full(rate.shape, -1, dtype=np.int32)
+        for a in range(len(rate)):
+            # Starts strictly after minute m: cumulative[m + 1:] (less a
+            # little slack for the rounding of the running sum)
+            target = cumulative[a, minutes + 1] + DUE_THRESHOLD - 1e-9
+            hit = np.searchsorted(cumulative[a], target, side='left')
+            found = hit < cumulative.shape[1]
+            due[a, found] = hit[found] - 1 - minutes[found]
+        return due
+
+    # Share of observed days on which each activity is in progress at minute m
+    def distribution(self, minute):
+        days = max(int(self.days[minute // MINUTES_PER_DAY]), 1)
+        return self.occupancy[:, minute] / days
+
+    def save(self, path, signature=None):
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, occupancy=self.occupancy, starts=self.starts, days=self.days, due=self.due,
+                 activities=np.array(self.activities), signature=np.array(json.dumps(signature)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, signature=None):
+        with np.load(path) as data:
+            if json.loads(str(data['signature'])) != signature:
+                raise ValueError(f"{path} was built from a different activity log")
+            tables = cls.__new__(cls)
+            tables.activities = [str(a) for a in data['activities']]
+            for name in ('occupancy', 'starts', 'days', 'due'):
+                setattr(tables, name, data[name])
+        return tables
+
+
+# Answers "what is the dog likely doing at t" and "what is due next after t"
+# from ForecastTables: the fleet-wide tables are saved next to the activity
+# store (forecast.npz) and reused while the store is unchanged; a pet's own
+# tables are built from its rows on first use and kept in a small LRU cache.
+class ActivityForecaster:
+    def __init__(self, store, tables, cache_size=256):
+        self.store = store
+        self.tables = tables
+        self.cache_size = cache_size
+        self._pet_tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    # What the saved tables were built from: the store's row count, sources
+    # and activities, and the size and mtime of the files they are read from
+    # (stores written by generationScript.py have no sources)
+    @staticmethod
+    def _signature(store):
+        files = {}
+        for name in SIGNATURE_FILES:
+            stat = os.stat(os.path.join(store.path, name))
+            files[name] = [stat.st_mtime_ns, stat.st_size]
+        return {'rows': len(store), 'sources': store.meta.get('sources', {}), 'activities': store.activities,
+                'files': files}
+
+    @classmethod
+    def open(cls, store, cache_size=256):
+        path = os.path.join(store.path, 'forecast.npz')
+        signature = cls._signature(store)
+        try:
+            tables = ForecastTables.load(path, signature)
+        except (OSError, ValueError, KeyError):
+            tables = ForecastTables.from_store(store)
+            try:
+                tables.save(path, signature)
+            except OSError:
+                pass  # read-only store: rebuild on every start
+        return cls(store, tables, cache_size)
+
+    def tables_for(self, pet=None):
+        if pet is None:
+            return self.tables
+        with self._lock:
+            tables = self._pet_tables.get(pet)
+            if tables is not None:
+                self._pet_tables.move_to_end(pet)
+                return tables
+        tables = ForecastTables.from_store(self.store, pet)
+        with self._lock:
+            self._pet_tables[pet] = tables
+            while len(self._pet_tables) > self.cache_size:
+                self._pet_tables.popitem(last=False)
+        return tables
+
+    # Probability of each activity being in progress at `at` (a datetime),
+    # most likely first
+    def activities_at(self, at, pet=None):
+        tables = self.tables_for(pet)
+        minute = at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+        probabilities = tables.distribution(minute)
+        order = np.argsort(-probabilities, kind='stable')
+        return [{'activity': tables.activities[a], 'probability': round(float(probabilities[a]), 4)}
+                for a in order if probabilities[a] > 0]
+
+    # When each activity is next due after `at`, soonest first
+    def next_activities(self, at, pet=None):
+        tables = self.tables_for(pet)
+        minute = at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+        due = tables.due[:, minute]
+        order = np.argsort(np.where(due < 0, np.iinfo(np.int32).max, due), kind='stable')
+        return [{'activity': tables.activities[a], 'in_minutes': int(due[a])} for a in order if due[a] >= 0]
@@ -1,11 +1,27 @@
+# Generates simulated daily activity logs for one or many pets.
+#
+#   python generationScript.py                       # Buddy, 90 days -> pet_activity_simulation.csv
+#   python generationScript.py --pets 20000 --days 730 --format store --out activity_store
+#
+# Pets are generated in batches on a process pool and written as each batch
+# finishes, so the full log is never held in memory. Every pet has its own
+# seed derived from --seed and its index, so output doesn't depend on the
+# number of workers.
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
 import pandas as pd
-import random
-from datetime import datetime, timedelta
 
-# Parameters
-pet_name = "Buddy"
-start_date = datetime(2025, 5, 1)  # first day
-num_days = 90  # how many days to generate
+from store import ActivityStoreWriter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Where model.py reads the log from
+DEFAULT_CSV = os.path.join(BASE_DIR, 'pet_activity_simulation.csv')
+DEFAULT_STORE = os.path.join(BASE_DIR, 'activity_store')
 
 # Duration ranges in minutes for each activity
 duration_ranges = {
@@ -19,66 +35,141 @@ duration_ranges = {
     "relax": (20, 60),
     "walk": (15, 60)
 }
+# Meal hours (inclusive)
+meal_hours = {"breakfast": (6, 8), "lunch": (11, 12), "dinner": (17, 18)}
+other_activities = ["play", "potty", "medicine", "relax", "walk"]
+
+activities = list(duration_ranges)
+activity_names = np.array([a.capitalize() for a in activities])
+_duration_lo = np.array([duration_ranges[a][0] for a in other_activities])
+_duration_hi = np.array([duration_ranges[a][1] for a in other_activities])
+_other_codes = np.array([activities.index(a) for a in other_activities])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate simulated pet activity logs")
+    parser.add_argument('--pets', type=int, default=1, help="number of pets (a single pet is named Buddy)")
+    parser.add_argument('--days', type=int, default=90, help="days of activity per pet")
+    parser.add_argument('--start-date', default='2025-05-01', help="first day, YYYY-MM-DD")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--format', choices=['csv', 'store', 'both'], default='csv',
+                        help="CSV, the memory-mapped ActivityStore layout read by model.py, or both")
+    parser.add_argument('--out', default=None,
+                        help=f"CSV path (default {DEFAULT_CSV}); with --format store this is the store directory "
+                             f"(default {DEFAULT_STORE})")
+    parser.add_argument('--store-out', default=None,
+                        help="store directory when --format both (default: --out without its extension + '_store', "
+                             f"or {DEFAULT_STORE})")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-pets', type=int, default=200, help="pets generated per task")
+    return parser.parse_args(argv)
+
+
+def pet_names(n_pets):
+    if n_pets == 1:
+        return ["Buddy"]
+    width = len(str(n_pets - 1))
+    return [f"Pet{i:0{width}d}" for i in range(n_pets)]
+
+
+# One pet's log, sampled a whole column at a time across all days
+def generate_pet(name, pet_index, num_days, start_date, seed):
+    rng = np.random.default_rng([seed, pet_index])
+    days = np.arange(num_days)
 
-# Helper to create an activity entry
-def create_activity(day_start, hour, minute, activity):
-    start_time = day_start.replace(hour=hour, minute=minute)
-    duration = random.randint(*duration_ranges[activity])
-    end_time = start_time + timedelta(minutes=duration)
-    return {
-        "pet": pet_name,
-        "activity": activity.capitalize(),
-        "start_time": start_time,
-        "duration_min": duration,
-        "end_time": end_time
-    }
-
-# Main generation
-records = []
-for d in range(num_days):
-    day_start = start_date + timedelta(days=d)
-    
     # Always start with sleep from previous night until morning
-    sleep_start = day_start.replace(hour=0, minute=0)
-    sleep_duration = random.randint(360, 480)  # 6–8 hrs
-    sleep_end = sleep_start + timedelta(minutes=sleep_duration)
-    records.append({
-        "pet": pet_name,
-        "activity": "Sleep",
-        "start_time": sleep_start,
-        "duration_min": sleep_duration,
-        "end_time": sleep_end
-    })
-    
+    day_idx = [days]
+    codes = [np.full(num_days, activities.index("sleep"))]
+    start_minute = [np.zeros(num_days, dtype=np.int64)]
+    duration = [rng.integers(360, 480, num_days, endpoint=True)]  # 6–8 hrs
+
     # Meal times
-    records.append(create_activity(day_start, random.randint(6, 8), random.randint(0, 59), "breakfast"))
-    records.append(create_activity(day_start, random.randint(11, 12), random.randint(0, 59), "lunch"))
-    records.append(create_activity(day_start, random.randint(17, 18), random.randint(0, 59), "dinner"))
-    
-    # Random other activities for the day
-    for _ in range(random.randint(5, 8)):
-        activity = random.choice(["play", "potty", "medicine", "relax", "walk"])
-        hour = random.randint(6, 21)  # between breakfast and bedtime
-        minute = random.randint(0, 59)
-        records.append(create_activity(day_start, hour, minute, activity))
-    
+    for meal, (first_hour, last_hour) in meal_hours.items():
+        day_idx.append(days)
+        codes.append(np.full(num_days, activities.index(meal)))
+        start_minute.append(rng.integers(first_hour, last_hour, num_days, endpoint=True) * 60
+                            + rng.integers(0, 59, num_days, endpoint=True))
+        duration.append(rng.integers(*duration_ranges[meal], num_days, endpoint=True))
+
+    # Random other activities for the day, between breakfast and bedtime
+    per_day = rng.integers(5, 8, num_days, endpoint=True)
+    total = per_day.sum()
+    choice = rng.integers(0, len(other_activities), total)
+    day_idx.append(np.repeat(days, per_day))
+    codes.append(_other_codes[choice])
+    start_minute.append(rng.integers(6, 21, total, endpoint=True) * 60 + rng.integers(0, 59, total, endpoint=True))
+    duration.append(rng.integers(_duration_lo[choice], _duration_hi[choice], endpoint=True))
+
     # Evening/overnight sleep
-    night_sleep_start = day_start.replace(hour=random.randint(21, 23), minute=random.randint(0, 59))
-    night_sleep_duration = random.randint(360, 540)
-    night_sleep_end = night_sleep_start + timedelta(minutes=night_sleep_duration)
-    records.append({
-        "pet": pet_name,
-        "activity": "Sleep",
-        "start_time": night_sleep_start,
-        "duration_min": night_sleep_duration,
-        "end_time": night_sleep_end
+    day_idx.append(days)
+    codes.append(np.full(num_days, activities.index("sleep")))
+    start_minute.append(rng.integers(21, 23, num_days, endpoint=True) * 60 + rng.integers(0, 59, num_days, endpoint=True))
+    duration.append(rng.integers(360, 540, num_days, endpoint=True))
+
+    day_idx, codes, start_minute, duration = (np.concatenate(c) for c in (day_idx, codes, start_minute, duration))
+    order = np.lexsort((start_minute, day_idx))
+    start_time = (np.datetime64(start_date, 'm') + day_idx[order] * 1440 + start_minute[order]).astype('datetime64[s]')
+    duration = duration[order]
+    return pd.DataFrame({
+        "pet_name": pd.Categorical.from_codes(np.zeros(len(order), dtype=np.int8), [name]),
+        "activity": activity_names[codes[order]],
+        "start_time": start_time,
+        "duration_minutes": duration,
+        "end_time": start_time + duration.astype('timedelta64[m]'),
     })
 
-# Convert to DataFrame
-df = pd.DataFrame(records)
-df = df.sort_values("start_time").reset_index(drop=True)
 
-# Save to CSV
-df.to_csv(r"C:\Users\ValerieAnnabella\Downloads\GitHub\PawSense\api\behaviour_prediction\pet_activity_simulation.csv", index=False)
+# Returns the batch's frame and, when as_csv is set, its CSV rows already
+# formatted so the parent only has to write them out
+def generate_batch(names, first_index, num_days, start_date, seed, as_csv=False):
+    frame = pd.concat([generate_pet(name, first_index + i, num_days, start_date, seed)
+                       for i, name in enumerate(names)], ignore_index=True)
+    csv = frame.to_csv(header=first_index == 0, index=False, date_format='%Y-%m-%d %H:%M:%S') if as_csv else None
+    return frame, csv
+
+
+# Yields (frame, csv) per batch in pet order, keeping at most two batches
+# per worker in flight
+def generate(args, as_csv=False):
+    names = pet_names(args.pets)
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d').date().isoformat()
+    batches = [(names[i:i + args.batch_pets], i) for i in range(0, len(names), args.batch_pets)]
+    if args.workers <= 1 or len(batches) == 1:
+        for batch, first_index in batches:
+            yield generate_batch(batch, first_index, args.days, start_date, args.seed, as_csv)
+        return
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pending = deque()
+        for batch, first_index in batches:
+            if len(pending) >= 2 * args.workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(generate_batch, batch, first_index, args.days, start_date, args.seed, as_csv))
+        while pending:
+            yield pending.popleft().result()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    csv_path = (args.out or DEFAULT_CSV) if args.format in ('csv', 'both') else None
+    store_path = (args.out or DEFAULT_STORE) if args.format == 'store' else args.store_out
+    if args.format == 'both' and not store_path:
+        store_path = os.path.splitext(args.out)[0] + '_store' if args.out else DEFAULT_STORE
+
+    writer = ActivityStoreWriter(store_path) if store_path else None
+    rows = 0
+    with open(csv_path, 'w', newline='') if csv_path else open(os.devnull, 'w') as csv_file:
+        for frame, csv in generate(args, as_csv=bool(csv_path)):
+            if csv_path:
+                csv_file.write(csv)
+            if writer:
+                writer.append(frame)
+            rows += len(frame)
+    if writer:
+        writer.close()
+
+    print(f"Generated {rows} activities for {args.pets} pets over {args.days} days"
+          + (f" -> {csv_path}" if csv_path else "") + (f" -> {store_path}" if store_path else ""))
+
 
-print(df)
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,21 @@
 import os
-import pandas as pd
+import math
+import threading
+from behaviour_prediction.store import ActivityStore
+from behaviour_prediction.forecast import ActivityForecaster
 from datetime import datetime, timedelta
 import random
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 csv_path = os.path.join(BASE_DIR, "pet_activity_simulation.csv")
+store_path = os.path.join(BASE_DIR, "activity_store")
 
-df = pd.read_csv(csv_path)
-
-df['start_time'] = pd.to_datetime(df['start_time'])
+SECONDS_PER_DAY = 24 * 3600
 
 def time_to_seconds(t):
     return t.hour * 3600 + t.minute * 60 + t.second
 
-df['start_seconds'] = df['start_time'].dt.time.apply(time_to_seconds)
-
-avg_seconds = df.groupby('activity')['start_seconds'].mean()
-
 def seconds_to_hms(seconds):
     seconds = int(seconds)
     h = seconds // 3600
@@ -25,13 +23,130 @@ def seconds_to_hms(seconds):
     s = seconds % 60
     return f"{h:02d}:{m:02d}:{s:02d}"
 
-def predict_day():
+# Running per-activity statistics of start times. Times of day are averaged on
+# the 24h circle (sum of sin/cos of the angle) so activities around midnight,
+# e.g. Sleep at 23:30 and 00:00, average to midnight instead of midday.
+# Each appended event is an O(1) update.
+class ActivityStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}  # activity -> [count, sum_sin, sum_cos]
+
+    def add(self, activity, start_time):
+        angle = 2 * math.pi * time_to_seconds(start_time) / SECONDS_PER_DAY
+        with self._lock:
+            stats = self._stats.setdefault(activity, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += math.sin(angle)
+            stats[2] += math.cos(angle)
+
+    # Adds precomputed per-activity (count, sin sum, cos sum) aggregates
+    def add_sums(self, activities, counts, sins, coss):
+        with self._lock:
+            for activity, count, sum_sin, sum_cos in zip(activities, counts, sins, coss):
+                if not count:
+                    continue
+                stats = self._stats.setdefault(activity, [0, 0.0, 0.0])
+                stats[0] += int(count)
+                stats[1] += float(sum_sin)
+                stats[2] += float(sum_cos)
+
+    def count(self, activity):
+        with self._lock:
+            return self._stats.get(activity, [0])[0]
+
+    def sums(self):
+        with self._lock:
+            return {activity: tuple(stats) for activity, stats in self._stats.items()}
+
+    # Circular mean start time of every activity, in seconds after midnight
+    def mean_start_seconds(self):
+        return circular_mean_seconds(self.sums())
+
+def circular_mean_seconds(sums):
+    means = {}
+    for activity, (count, sum_sin, sum_cos) in sorted(sums.items()):
+        if count == 0:
+            continue
+        angle = math.atan2(sum_sin, sum_cos) % (2 * math.pi)
+        means[activity] = angle / (2 * math.pi) * SECONDS_PER_DAY
+    return means
+
+# PAWSENSE_ACTIVITY_STORE points at a prebuilt store (e.g. from
+# generationScript.py --format store); otherwise one is built from the CSV
+if os.environ.get('PAWSENSE_ACTIVITY_STORE'):
+    store = ActivityStore(os.environ['PAWSENSE_ACTIVITY_STORE'])
+else:
+    store = ActivityStore.open(store_path, csv_path)
+
+# Stats over every pet: the log totals saved in the store plus live events
+activity_stats = ActivityStats()
+activity_stats.add_sums(store.activities, *store.total_sums())
+# Live events per (pet, weekday), merged with the store slice on lookup
+pet_stats = {}
+# Minute-of-week occupancy tables of the log, saved in the store directory
+forecaster = ActivityForecaster.open(store)
+
+# Feeds a newly logged activity into the live statistics
+# Every argument is checked before any statistics are touched, so a rejected
+# event leaves no trace
+def record_activity(activity, start_time, pet=None):
+    if not isinstance(activity, str):
+        raise TypeError(f"activity must be a string, not {type(activity).__name__}")
+    if pet is not None and not isinstance(pet, str):
+        raise TypeError(f"pet_name must be a string, not {type(pet).__name__}")
+    if isinstance(start_time, str):
+        start_time = datetime.fromisoformat(start_time)
+    elif not isinstance(start_time, datetime):
+        raise TypeError(f"start_time must be an ISO datetime string, not {type(start_time).__name__}")
+    activity_stats.add(activity, start_time)
+    if pet is not None:
+        pet_stats.setdefault((pet, start_time.weekday()), ActivityStats()).add(activity, start_time)
+
+def _slice_stats(pet, weekday):
+    stats = ActivityStats()
+    days = range(7) if weekday is None else [weekday]
+    if pet is None:
+        stats.add_sums(store.activities, *store.total_sums(weekday))
+    elif pet in store.offsets:
+        stats.add_sums(store.activities, *store.slice_sums(pet, weekday))
+    for (name, day), live in list(pet_stats.items()):
+        if (pet is None or name == pet) and day in days:
+            for activity, (count, sum_sin, sum_cos) in live.sums().items():
+                stats.add_sums([activity], [count], [sum_sin], [sum_cos])
+    return stats
+
+def known_pet(pet):
+    return pet in store.offsets or any(key[0] == pet for key in list(pet_stats))
+
+# Average start time of each activity, over all pets by default or for one
+# pet and/or one weekday (Monday=0)
+def predict_day(pet=None, weekday=None):
+    stats = activity_stats if pet is None and weekday is None else _slice_stats(pet, weekday)
     avg_times_list = []
-    for activity, avg_sec in avg_seconds.items():
+    for activity, avg_sec in stats.mean_start_seconds().items():
         avg_times_list.append({
             'activity': activity,
             'average_start_time': seconds_to_hms(avg_sec)
         })
 
-    print(avg_times_list)
     return avg_times_list
+
+# What a pet (or, by default, the average pet) is likely doing at `at`
+# (default now) and when each activity is next due. Raises KeyError for a
+# pet that is not in the activity log.
+def forecast(pet=None, at=None):
+    if at is None:
+        at = datetime.now()
+    elif isinstance(at, str):
+        at = datetime.fromisoformat(at)
+    if pet is not None and pet not in forecaster.store.offsets:
+        raise KeyError(pet)
+    upcoming = forecaster.next_activities(at, pet)
+    for item in upcoming:
+        item['expected_at'] = (at + timedelta(minutes=item['in_minutes'])).isoformat(timespec='minutes')
+    return {
+        'time': at.isoformat(timespec='minutes'),
+        'current': forecaster.activities_at(at, pet),
+        'next': upcoming,
+    }
@@ -0,0 +1,194 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+# Older logs (and generationScript.py before it was fixed) used these names
+LEGACY_COLUMNS = {'pet': 'pet_name', 'duration_min': 'duration_minutes'}
+
+COLUMNS = ['activity', 'start_seconds', 'duration_minutes', 'start_epoch']
+DTYPES = {'activity': np.int16, 'start_seconds': np.int32, 'duration_minutes': np.int32, 'start_epoch': np.int64}
+
+def read_activity_log(path, **kwargs):
+    frame = pd.read_csv(path, **kwargs)
+    return frame.rename(columns=LEGACY_COLUMNS)
+
+# Angle sums of start times per activity code, the building block of the
+# circular means in model.py
+def angle_sums(activity_codes, start_seconds, n_activities):
+    angle = 2 * np.pi * np.asarray(start_seconds, dtype=np.float64) / 86400
+    counts = np.bincount(activity_codes, minlength=n_activities)
+    sin = np.bincount(activity_codes, weights=np.sin(angle), minlength=n_activities)
+    cos = np.bincount(activity_codes, weights=np.cos(angle), minlength=n_activities)
+    return counts, sin, cos
+
+
+# Activity log stored column-wise as .npy files, sorted by pet, then weekday
+# (Monday=0), then start time. meta.json maps every pet to 8 row offsets so
+# the rows of one pet on one weekday are a contiguous slice. The columns are
+# memory-mapped on open, so startup cost and resident memory do not grow with
+# the size of the log.
+class ActivityStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.activities = self.meta['activities']
+        self.offsets = self.meta['offsets']
+        self.columns = {col: np.load(os.path.join(path, f'{col}.npy'), mmap_mode='r') for col in COLUMNS}
+
+    @property
+    def pets(self):
+        return list(self.offsets)
+
+    def __len__(self):
+        return len(self.columns['activity'])
+
+    # Row range of a pet, optionally restricted to one weekday
+    def row_range(self, pet, weekday=None):
+        offsets = self.offsets[pet]
+        if weekday is None:
+            return offsets[0], offsets[7]
+        return offsets[weekday], offsets[weekday + 1]
+
+    def slice(self, pet, weekday=None):
+        start, end = self.row_range(pet, weekday)
+        return {col: values[start:end] for col, values in self.columns.items()}
+
+    # (counts, sin sums, cos sums) per activity over the whole log, or over
+    # one weekday of every pet, computed at build time. Stores written before
+    # the weekday totals were kept are summed pet by pet.
+    def total_sums(self, weekday=None):
+        if weekday is None:
+            totals = self.meta['totals']
+        elif 'weekday_totals' in self.meta:
+            totals = self.meta['weekday_totals'][weekday]
+        else:
+            sums = np.zeros((3, len(self.activities)))
+            for pet in self.offsets:
+                sums += self.slice_sums(pet, weekday)
+            return sums[0].astype(int), sums[1], sums[2]
+        return np.array(totals['count']), np.array(totals['sin']), np.array(totals['cos'])
+
+    def slice_sums(self, pet, weekday=None):
+        rows = self.slice(pet, weekday)
+        return angle_sums(rows['activity'], rows['start_seconds'], len(self.activities))
+
+    @classmethod
+    def build(cls, sources, path):
+        if isinstance(sources, (str, os.PathLike)):
+            sources = [sources]
+        frame = pd.concat([read_activity_log(source, usecols=lambda c: c != 'end_time') for source in sources],
+                          ignore_index=True)
+        writer = ActivityStoreWriter(path)
+        writer.append(frame)
+        writer.close(sources={os.path.abspath(s): os.path.getmtime(s) for s in sources})
+        return cls(path)
+
+    # Opens the store at `path`, rebuilding it first if it is missing or older
+    # than any of its source CSVs
+    @classmethod
+    def open(cls, path, sources):
+        if isinstance(sources, (str, os.PathLike)):
+            sources = [sources]
+        try:
+            store = cls(path)
+        except (OSError, ValueError, KeyError):
+            return cls.build(sources, path)
+        built_from = store.meta.get('sources', {})
+        for source in sources:
+            if built_from.get(os.path.abspath(source)) != os.path.getmtime(source):
+                return cls.build(sources, path)
+        return store
+
+
+# Writes an ActivityStore incrementally. Each appended frame must hold every
+# row of the pets it contains, so a log far larger than memory can be written
+# a batch of pets at a time. Columns are appended to raw files and turned into
+# .npy files on close().
+class ActivityStoreWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._files = {col: open(os.path.join(path, f'{col}.bin.tmp'), 'wb') for col in COLUMNS}
+        self._activity_codes = {}
+        self._offsets = {}
+        self._rows = 0
+        self._totals = np.zeros((7, 3, 0))  # per weekday
+
+    def append(self, frame):
+        if not len(frame):
+            return
+        frame = frame.rename(columns=LEGACY_COLUMNS)
+        start = pd.to_datetime(frame['start_time'])
+        pet_codes, pets = pd.factorize(frame['pet_name'])
+        repeated = [pet for pet in pets if pet in self._offsets]
+        if repeated:
+            raise ValueError(f"Rows for pet {repeated[0]!r} were already written in an earlier batch")
+
+        activity_codes, activities = pd.factorize(frame['activity'])
+        for activity in activities:
+            self._activity_codes.setdefault(str(activity), len(self._activity_codes))
+        activity_codes = np.array([self._activity_codes[str(a)] for a in activities], dtype=np.int64)[activity_codes]
+
+        weekday = start.dt.weekday.to_numpy()
+        start_seconds = (start.dt.hour * 3600 + start.dt.minute * 60 + start.dt.second).to_numpy()
+        order = np.lexsort((start_seconds, weekday, pet_codes))
+
+        keys = pet_codes[order].astype(np.int64) * 7 + weekday[order]
+        bounds = np.searchsorted(keys, np.arange(len(pets) * 7 + 1)) + self._rows
+        for p, pet in enumerate(pets):
+            self._offsets[str(pet)] = bounds[p * 7:p * 7 + 8].tolist()
+
+        data = {
+            'activity': activity_codes[order],
+            'start_seconds': start_seconds[order],
+            'duration_minutes': frame['duration_minutes'].to_numpy()[order],
+            'start_epoch': ((start - pd.Timestamp(0)) // pd.Timedelta(seconds=1)).to_numpy()[order],
+        }
+        for col in COLUMNS:
+            np.ascontiguousarray(data[col], dtype=DTYPES[col]).tofile(self._files[col])
+
+        day = weekday[order]
+        totals = np.array([angle_sums(data['activity'][day == d], data['start_seconds'][day == d],
+                                      len(self._activity_codes)) for d in range(7)])
+        self._totals = np.pad(self._totals, ((0, 0), (0, 0), (0, totals.shape[2] - self._totals.shape[2]))) + totals
+        self._rows += len(frame)
+
+    def close(self, sources=None):
+        for col in COLUMNS:
+            self._files[col].close()
+            raw_path = os.path.join(self.path, f'{col}.bin.tmp')
+            tmp_path = os.path.join(self.path, f'{col}.npy.tmp')
+            with open(raw_path, 'rb') as raw, open(tmp_path, 'wb') as out:
+                np.lib.format.write_array_header_1_0(out, {
+                    'descr': np.lib.format.dtype_to_descr(np.dtype(DTYPES[col])),
+                    'fortran_order': False,
+                    'shape': (self._rows,),
+                })
+                shutil.copyfileobj(raw, out, 1 << 20)
+            os.remove(raw_path)
+            os.replace(tmp_path, os.path.join(self.path, f'{col}.npy'))
+
+        def sums(totals):
+            counts, sin, cos = totals
+            return {'count': counts.astype(int).tolist(), 'sin': sin.tolist(), 'cos': cos.tolist()}
+
+        meta = {
+            'activities': sorted(self._activity_codes, key=self._activity_codes.get),
+            'offsets': self._offsets,
+            'rows': self._rows,
+            'sources': sources or {},
+            'totals': sums(self._totals.sum(axis=0)),
+            'weekday_totals': [sums(totals) for totals in self._totals],
+        }
+        tmp_meta = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, os.path.join(self.path, 'meta.json'))
+        # Tables derived from a previous log in this directory are stale
+        try:
+            os.remove(os.path.join(self.path, 'forecast.npz'))
+        except FileNotFoundError:
+            pass
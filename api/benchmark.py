@@ -0,0 +1,304 @@
+# Offline benchmarks for the API hot paths.
+#
+#   python benchmark.py --output baseline.json           # record a baseline
+#   python benchmark.py --compare baseline.json          # flag regressions > 10%
+#
+# Metric names hold the problem size (pets, batch rows), not measured counts,
+# so runs of the same mode (--quick or not) can be compared; a baseline
+# metric the current run did not produce fails the comparison.
+#
+# Requests go through the Flask test client, so no server is needed. When
+# ../machine-learning/model.joblib is missing, a small stand-in model is
+# trained on synthetic readings so the suite still runs.
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, '..', 'machine-learning')
+sys.path.insert(0, os.path.join(BASE_DIR, 'behaviour_prediction'))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PawSense API hot paths")
+    parser.add_argument('--output', help="write results to this JSON file")
+    parser.add_argument('--compare', help="baseline JSON file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed relative slowdown (0.10 = 10%%)")
+    parser.add_argument('--requests', type=int, default=500, help="requests per endpoint")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes, for a smoke run")
+    return parser.parse_args(argv)
+
+
+# Trains a small classifier with the real encoders' categories when the
+# model artifact is missing, exports it like machine-learning/model.py does
+# (joblib and native), and points api.py at it via PAWSENSE_MODEL_DIR
+def ensure_model():
+    if os.environ.get('PAWSENSE_MODEL_DIR') or os.path.exists(os.path.join(MODEL_DIR, 'model.joblib')):
+        return None
+    import joblib
+    import pandas as pd
+    import xgboost as xgb
+    from client import generate_client_data_batch
+    from encoder import FeatureEncoder
+
+    label_encoders = joblib.load(os.path.join(MODEL_DIR, 'label_encoders.joblib'))
+    target_le = joblib.load(os.path.join(MODEL_DIR, 'target_le.joblib'))
+    rng = np.random.default_rng(0)
+    readings = generate_client_data_batch(5000, seed=rng, as_frame=True)
+    for col, le in label_encoders.items():
+        readings[col] = le.classes_[rng.integers(0, len(le.classes_), len(readings))]
+    encoder = FeatureEncoder(label_encoders)
+    X = pd.DataFrame(encoder.encode_many(readings.to_dict('records'))[0], columns=encoder.features)
+    y = rng.integers(0, len(target_le.classes_), len(X))
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=5, tree_method='hist', n_jobs=1).fit(X, y)
+
+    model_dir = tempfile.mkdtemp(prefix='pawsense-bench-model-')
+    training = load_training_module()
+    training.save_artifacts(model_dir, model, label_encoders, target_le)
+    os.environ['PAWSENSE_MODEL_DIR'] = model_dir
+    print(f"model.joblib not found, using a stand-in model in {model_dir}", file=sys.stderr)
+    return model_dir
+
+
+def load_training_module():
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('training', os.path.join(MODEL_DIR, 'model.py'))
+    training = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(training)
+    return training
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def latency_stats(name, timings, extra=None):
+    timings = np.asarray(timings) * 1000
+    results = {
+        f'{name}.p50_ms': (float(np.percentile(timings, 50)), 'lower'),
+        f'{name}.p95_ms': (float(np.percentile(timings, 95)), 'lower'),
+        f'{name}.p99_ms': (float(np.percentile(timings, 99)), 'lower'),
+        f'{name}.throughput_rps': (float(len(timings) / timings.sum() * 1000), 'higher'),
+    }
+    results.update(extra or {})
+    return results
+
+
+def time_calls(fn, n, warmup=10):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def rate(fn, items, min_time=0.5):
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return runs * items / elapsed
+
+
+def bench_endpoints(api, n):
+    client = api.app.test_client()
+    results = {}
+    with quiet():
+        statuses = []
+        timings = time_calls(lambda: statuses.append(client.get('/data').status_code), n)
+        results.update(latency_stats('data', timings))
+        results.update(latency_stats('predict', time_calls(lambda: client.get('/predict'), n)))
+        results.update(latency_stats('predict_pet_weekday', time_calls(lambda: client.get('/predict?pet=Buddy&weekday=2'), n)))
+
+        batch = [encodable_reading(api) for _ in range(256)]
+        timings = time_calls(lambda: client.post('/data/batch', json=batch), max(10, n // 10))
+        results.update(latency_stats('data_batch_256', timings, {
+            'data_batch_256.readings_per_s': (256 * len(timings) / sum(timings), 'higher'),
+        }))
+    print(f"/data returned {statuses.count(200)}/{len(statuses)} predictions "
+          "(the rest are readings with categories the encoders don't know)", file=sys.stderr)
+    return results
+
+
+def encodable_reading(api):
+    from client import retrieve_client_data
+    reading = retrieve_client_data()
+    for col, lookup in api.model_registry.current().feature_encoder.lookups.items():
+        if reading[col] not in lookup:
+            reading[col] = random.choice(list(lookup))
+    return reading
+
+
+def bench_generation(quick):
+    from client import retrieve_client_data, generate_client_data_batch
+    n = 100_000 if quick else 1_000_000
+    return {
+        'retrieve_client_data.readings_per_s': (rate(retrieve_client_data, 1), 'higher'),
+        'generate_client_data_batch.readings_per_s': (rate(lambda: generate_client_data_batch(n, seed=0), n), 'higher'),
+    }
+
+
+def bench_encoding(api):
+    readings = [encodable_reading(api) for _ in range(1000)]
+    reading = readings[0]
+    encoder = api.model_registry.current().feature_encoder
+    encode_timings = time_calls(lambda: encoder.encode(reading), 10_000)
+    return {
+        'encode_one.mean_us': (float(np.mean(encode_timings) * 1e6), 'lower'),
+        'encode_many.readings_per_s': (rate(lambda: encoder.encode_many(readings), len(readings)), 'higher'),
+    }
+
+
+# predict_proba of the serving model (native or joblib, see PAWSENSE_NATIVE_MODEL)
+# on one row and on a 256-row batch
+def bench_inference(api):
+    bundle = api.model_registry.current()
+    batch = bundle.feature_encoder.encode_many([encodable_reading(api) for _ in range(256)])[0]
+    row = batch[:1]
+    timings = time_calls(lambda: bundle.model.predict_proba(row), 2000)
+    return {
+        f'predict_proba_one.{bundle.format}.mean_us': (float(np.mean(timings) * 1e6), 'lower'),
+        f'predict_proba_256.{bundle.format}.rows_per_s': (rate(lambda: bundle.model.predict_proba(batch), len(batch)), 'higher'),
+    }
+
+
+# One fleet-wide batch of vitals (one reading from each of n collars) per call
+def bench_anomaly(quick):
+    from anomaly import VitalsMonitor, VITALS, cohort_codes
+    from client import generate_client_data_batch
+    n = 1000 if quick else 10_000
+    columns = generate_client_data_batch(n, seed=0)
+    collar_ids = [f'collar{i}' for i in range(n)]
+    cohorts = cohort_codes(columns['size'], columns['age'])
+    values = np.column_stack([columns[v] for v in VITALS]).astype(np.float64)
+    monitor = VitalsMonitor()
+    return {
+        'anomaly_fleet_batch.readings_per_s': (rate(lambda: monitor.score(collar_ids, cohorts, values), n), 'higher'),
+    }
+
+
+# predict_day for one pet and for every pet on one weekday, against
+# generated stores of increasing size
+def bench_predict_day(quick):
+    import behaviour_prediction.model as behaviour_model
+    from generationScript import generate_batch, pet_names
+    from store import ActivityStore, ActivityStoreWriter
+    from forecast import ForecastTables
+
+    results = {}
+    original_store = behaviour_model.store
+    tmp = tempfile.mkdtemp(prefix='pawsense-bench-store-')
+    try:
+        for n_pets in [10, 100] if quick else [10, 100, 1000]:
+            path = os.path.join(tmp, f'{n_pets}')
+            writer = ActivityStoreWriter(path)
+            names = pet_names(n_pets)
+            for first in range(0, n_pets, 100):
+                frame, _ = generate_batch(names[first:first + 100], first, 365, '2025-05-01', 0)
+                writer.append(frame)
+            writer.close()
+            behaviour_model.store = ActivityStore(path)
+            with quiet():
+                pet = time_calls(lambda: behaviour_model.predict_day(names[n_pets // 2]), 50, warmup=2)
+                weekday = time_calls(lambda: behaviour_model.predict_day(weekday=2), 5, warmup=1)
+            results[f'predict_day_pet.{n_pets}_pets.mean_ms'] = (float(np.mean(pet) * 1000), 'lower')
+            results[f'predict_day_weekday.{n_pets}_pets.mean_ms'] = (float(np.mean(weekday) * 1000), 'lower')
+            build = time_calls(lambda: ForecastTables.from_store(behaviour_model.store), 3, warmup=0)
+            results[f'forecast_build.{n_pets}_pets.mean_ms'] = (float(np.mean(build) * 1000), 'lower')
+    finally:
+        behaviour_model.store = original_store
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def run(args):
+    random.seed(0)
+    np.random.seed(0)
+    stand_in = ensure_model()
+    with quiet():
+        import api
+        api.warm_up()
+    results = {}
+    try:
+        for name, bench in [('endpoints', lambda: bench_endpoints(api, args.requests)),
+                            ('generation', lambda: bench_generation(args.quick)),
+                            ('encoding', lambda: bench_encoding(api)),
+                            ('inference', lambda: bench_inference(api)),
+                            ('anomaly', lambda: bench_anomaly(args.quick)),
+                            ('predict_day', lambda: bench_predict_day(args.quick))]:
+            start = time.perf_counter()
+            results.update(bench())
+            print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    finally:
+        if stand_in:
+            shutil.rmtree(stand_in, ignore_errors=True)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'stand_in_model': bool(stand_in),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': {name: {'value': value, 'better': better} for name, (value, better) in results.items()},
+    }
+
+
+# Lists metrics that got worse than the baseline by more than `threshold`,
+# and baseline metrics missing from the current run
+def compare(current, baseline, threshold):
+    regressions = []
+    missing = []
+    for name, base in baseline['results'].items():
+        now = current['results'].get(name)
+        if now is None:
+            missing.append(name)
+            continue
+        if not base['value']:
+            continue
+        change = (now['value'] - base['value']) / base['value']
+        worse = change > threshold if base['better'] == 'lower' else change < -threshold
+        if worse:
+            regressions.append((name, base['value'], now['value'], change))
+    return regressions, missing
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    for name, result in report['results'].items():
+        print(f"{name:50s} {result['value']:>14.3f}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions, missing = compare(report, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({change:+.1%})")
+        for name in missing:
+            print(f"MISSING {name}: in the baseline but not measured in this run")
+        if regressions or missing:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
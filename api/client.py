@@ -1,6 +1,7 @@
 # from flask import Flask, request, jsonify, render_template_string
 import random
 import numpy as np
+import pandas as pd
 from datetime import datetime, timezone
 
 # --- Available values for manual selection ---
@@ -15,8 +16,8 @@ possible_values = {
         "wag_direction": ["Neutral", "Right-slight"],
         "bark_pitch": {"Small": (300,400), "Medium": (250,350), "Large": (200,300)},
         "bark_loudness": {"Small": (60,70), "Medium": (55,65), "Large": (55,65)},
-        "bark_duration": (random.randint(20,50) / 100.0) + random.randint(-5,15)/100.0,
-        "head_tilt": random.randint(0,500) / 100.0 + random.randint(0,200) / 100, 
+        "bark_duration": ((20,50), (-5,15)),
+        "head_tilt": ((0,500), (0,200)),
         "context": ["Home", "Backyard", "Quiet Park"]
     },
     "Excited": {
@@ -29,8 +30,8 @@ possible_values = {
         "wag_direction": ["Right"],
         "bark_pitch": {"Small": (700,1000), "Medium": (500,800), "Large": (350,600)},
         "bark_loudness": {"Small": (70,90), "Medium": (70,85), "Large": (75,90)},
-        "bark_duration": (random.randint(20,100) / 100.0) + random.randint(-10,10)/100.0,
-        "head_tilt": random.randint(0,1500) / 100.0 + random.randint(0,300) / 100.0,
+        "bark_duration": ((20,100), (-10,10)),
+        "head_tilt": ((0,1500), (0,300)),
         "context": ["Home", "Backyard", "Park", "Dog Park"]
     },
     "Sad": {
@@ -43,8 +44,8 @@ possible_values = {
         "wag_direction": ["Neutral", "Left"],
         "bark_pitch": {"Small": (400,600), "Medium": (250,400), "Large": (200,300)},
         "bark_loudness": {"Small": (50,60), "Medium": (40,60), "Large": (40,55)},
-        "bark_duration": (random.randint(100,200) / 100.0) + random.randint(-50,100)/100.0,  # >1.0s
-        "head_tilt": random.randint(0,500) / 100.0 + random.randint(0,200) / 100.0,
+        "bark_duration": ((100,200), (-50,100)),  # >1.0s
+        "head_tilt": ((0,500), (0,200)),
         "context": ["Alone Room", "Home", "Quiet Backyard"]
     },
     "Angry": {
@@ -57,8 +58,8 @@ possible_values = {
         "wag_direction": ["Neutral", "Left"],
         "bark_pitch": {"Small": (250,450), "Medium": (150,350), "Large": (150,300)},
         "bark_loudness": {"Small": (85,100), "Medium": (80,95), "Large": (80,100)},
-        "bark_duration": (random.randint(20,50) / 100.0) + random.randint(-10,10),  # or growl-continuous
-        "head_tilt": random.randint(0,500) / 100.0 + random.randint(0,200) / 100.0,
+        "bark_duration": ((20,50), (-1000,1000)),  # or growl-continuous
+        "head_tilt": ((0,500), (0,200)),
         "context": ["Territory", "Home", "Fence"]
     },
     "Hungry": {
@@ -71,8 +72,8 @@ possible_values = {
         "wag_direction": ["Right"],
         "bark_pitch": {"Small": (450,650), "Medium": (350,500), "Large": (250,400)},
         "bark_loudness": {"Small": (65,80), "Medium": (60,75), "Large": (60,75)},
-        "bark_duration": (random.randint(20,50) / 100.0) + random.randint(-10,20)/100.0,
-        "head_tilt": random.randint(0,1000) / 100.0 + random.randint(0,300) / 100.0,
+        "bark_duration": ((20,50), (-10,20)),
+        "head_tilt": ((0,1000), (0,300)),
         "context": ["Food Prep", "Location", "Kitchen", "Dining Area"]
     },
     "Scared": {
@@ -85,8 +86,8 @@ possible_values = {
         "wag_direction": ["Left"],
         "bark_pitch": {"Small": (700,1000), "Medium": (600,900), "Large": (500,750)},
         "bark_loudness": {"Small": (65,85), "Medium": (60,80), "Large": (60,80)},
-        "bark_duration": (random.randint(20,100) / 100.0) + random.randint(-5,20)/100.0,  # Variable
-        "head_tilt": random.randint(0,1500) / 100.0 + random.randint(0,1500) / 100.0,
+        "bark_duration": ((20,100), (-5,20)),  # Variable
+        "head_tilt": ((0,1500), (0,1500)),
         "context": ["Stranger", "Loud Noise", "Vet Clinic"]
     },
     "Alert": {
@@ -99,22 +100,42 @@ possible_values = {
         "wag_direction": ["Neutral"],
         "bark_pitch": {"Small": (450,650), "Medium": (350,500), "Large": (250,400)},
         "bark_loudness": {"Small": (70,85), "Medium": (65,80), "Large": (65,80)},
-        "bark_duration": (random.randint(30,70) / 100.0) + (random.randint(-20,20)/100.0),
-        "head_tilt": round(random.randint(0,1000) / 100.0 + random.randint(0,200) / 100.0, 2),
+        "bark_duration": ((30,70), (-20,20)),
+        "head_tilt": ((0,1000), (0,200)),
         "context": ["New Sound", "Movement", "Unknown Object"]
     }
 }
 
+emotions = ["Neutral", "Excited", "Sad", "Angry", "Hungry", "Scared", "Alert"]
+activities = ["Playing", "Potty", "Medication", "Sleeping", "Feeding", "Exercising"]
+sizes = ["Small", "Medium", "Large"]
+
+# bark_duration / head_tilt / tail wag values are the sum of a base and a jitter
+# randint, both in hundredths (tail_wag_amplitude is in whole degrees)
+tail_wag_speed_ranges = {"Angry": ((0,100), (0,50)), "Excited": ((250,400), (-100,150)), "Hungry": ((100,200), (-20,20)), "Neutral": ((50,200), (-15,15)), "Sad": ((0,100), (0,15)), "Scared": ((0,100), (0,50)), "Alert": ((0,150), (0,75))}
+tail_wag_amplitude_ranges = {"Angry": ((0,30), (0,10)), "Excited": ((60,90), (-10,10)), "Hungry": ((30,60), (-10,10)), "Neutral": ((30,60), (-15,15)), "Sad": ((0,30), (0,15)), "Scared": ((0,30), (0,10)), "Alert": ((30,60), (-10,10))}
+# Max daily steps per size for (puppy < 1y, senior > 7y, adult)
+max_steps = {"Small": (12000, 10000, 15000), "Medium": (15000, 12000, 18000), "Large": (18000, 12000, 20000)}
+# kcal range and steps divisor per size
+calorie_burn = {"Small": ((4,10), 12000), "Medium": ((10,25), 6000), "Large": ((25,44), 8000)}
+latitude_range = (-27.638686676839207, -27.35052525945719)
+longitude_range = (152.93032865374974, 153.11524474137644)
+temperature_range = (38.3, 39.2)
+
 def roundUniform(min, max):
     return round(random.uniform(min, max), 2) 
 
+def randintSum(base, jitter):
+    return random.randint(*base) + random.randint(*jitter)
+
+def age_bracket(age):
+    return 0 if age < 1 else 1 if age > 7 else 2
+
 # Helper: generate random dataset
 def retrieve_client_data():
-    emotions = ["Neutral", "Excited", "Sad", "Angry", "Hungry", "Scared", "Alert"]
-    activity = ["Playing", "Potty", "Medication", "Sleeping", "Feeding", "Exercising"]
     chosen_emotion = random.choice(emotions)
     size = random.choice(possible_values[chosen_emotion]["size"])
-    age = random.choice(possible_values[chosen_emotion]["age_group"])
+    age = random.randint(*possible_values[chosen_emotion]["age_group"])
     base_heart_rate = roundUniform(*possible_values[chosen_emotion]["heart_rate"][size])
     heart_rate = 60 # default value
     if age < 1:
@@ -122,43 +143,122 @@ def retrieve_client_data():
     elif age > 7:
         base_heart_rate -= 5
     heart_rate = round(base_heart_rate + random.randint(-15,15), 2)
-    tail_wag_speed = {"Angry": (random.randint(0,100) / 100.0) + random.randint(0,50)/100.0, "Excited": (random.randint(250,400) / 100.0) + random.randint(-100,150) / 100.0, "Hungry": (random.randint(100,200) / 100.0) + random.randint(-20,20) / 100, "Neutral": (random.randint(50,200) / 100.0) + random.randint(-15,15)/100.0, "Sad": (random.randint(0,100) / 100.0) + random.randint(0,15) /100, "Scared": (random.randint(0,100) / 100.0) + random.randint(0,50)/100.0, "Alert": (random.randint(0,150) / 100.0) + random.randint(0, 75)/100.0}
-    tail_wag_amplitude = {"Angry": random.randint(0,30) + random.randint(0,10), "Excited": random.randint(60,90) + random.randint(-10,10), "Hungry": random.randint(30,60) + random.randint(-10,10), "Neutral": random.randint(30,60) + random.randint(-15,15), "Sad": random.randint(0,30) + random.randint(0,15), "Scared": random.randint(0,30) + random.randint(0,10), "Alert": random.randint(30,60) + random.randint(-10,10)}
-    bark_pitch = 0 # default value
-    if size == "Large":
-        if bark_pitch < 1:
-            bark_pitch += 30
-        elif bark_pitch > 7:
-            bark_pitch -= 15
-    else:
-        if bark_pitch < 1:
-            bark_pitch += 40
-        elif bark_pitch > 7:
-            bark_pitch -= 20
+    tail_wag_speed = randintSum(*tail_wag_speed_ranges[chosen_emotion]) / 100.0
+    tail_wag_amplitude = randintSum(*tail_wag_amplitude_ranges[chosen_emotion])
+    bark_pitch = 30 if size == "Large" else 40
     bark_pitch += random.randint(-15,15)
-    steps = {"Small": random.randint(0, 12000) if age < 1 else random.randint(0, 10000) if age > 7 else random.randint(0, 15000), "Medium": random.randint(0, 15000) if age < 1 else random.randint(0, 12000) if age > 7 else random.randint(0, 18000), "Large": random.randint(0, 18000) if age < 1 else random.randint(0, 12000) if age > 7 else random.randint(0, 20000)}
-    latitude = round(random.uniform(-27.638686676839207, -27.35052525945719), 2)
-    longitude = round(random.uniform(152.93032865374974, 153.11524474137644), 2)
-    temperature = roundUniform(38.3,39.2)
-    calories = {"Small":  (roundUniform(4,10) / 0.4) * steps[size]/12000 * 0.8, "Medium": (roundUniform(10,25) / 0.4) * steps[size]/6000 * 0.8, "Large": (roundUniform(25,44) / 0.4) * steps[size]/8000 * 0.8}
+    steps = random.randint(0, max_steps[size][age_bracket(age)])
+    latitude = round(random.uniform(*latitude_range), 2)
+    longitude = round(random.uniform(*longitude_range), 2)
+    temperature = roundUniform(*temperature_range)
+    kcal_range, steps_divisor = calorie_burn[size]
+    calories = (roundUniform(*kcal_range) / 0.4) * steps/steps_divisor * 0.8
     return {
-        "size": random.choice(possible_values[chosen_emotion]["size"]),
+        "size": size,
         "age": age,
         "heart_rate": round(heart_rate,0),
-        "tail_wag_speed": round(tail_wag_speed[chosen_emotion],2),
-        "tail_wag_amplitude": tail_wag_amplitude[chosen_emotion],
+        "tail_wag_speed": round(tail_wag_speed,2),
+        "tail_wag_amplitude": tail_wag_amplitude,
         "tail_position": random.choice(possible_values[chosen_emotion]["tail_position"]),
         "tail_stiffness": random.choice(possible_values[chosen_emotion]["tail_stiffness"]),
         "wag_direction": random.choice(possible_values[chosen_emotion]["wag_direction"]),
         "bark_pitch": round(bark_pitch,2),
         "bark_loudness": round(roundUniform(*possible_values[chosen_emotion]["bark_loudness"][size]) + random.randint(-15,15),2),
-        "bark_duration": round(possible_values[chosen_emotion]["bark_duration"],2),
-        "head_tilt": round(possible_values[chosen_emotion]["head_tilt"],2),
+        "bark_duration": round(randintSum(*possible_values[chosen_emotion]["bark_duration"]) / 100.0,2),
+        "head_tilt": round(randintSum(*possible_values[chosen_emotion]["head_tilt"]) / 100.0,2),
         "context": random.choice(possible_values[chosen_emotion]["context"]),
-        "activity": random.choice(activity),
-        "steps": steps[size],
+        "activity": random.choice(activities),
+        "steps": steps,
         "latitude": latitude,
         "longitude":longitude,
         "temperature": temperature,
-        "calories": round(calories[size],2)
+        "calories": round(calories,2)
+    }
+
+# --- Vectorized generator ---
+# Lookup tables indexed by emotion (and size) so a whole batch can be sampled
+# with one NumPy call per column.
+
+def _range_table(ranges):
+    return np.array([ranges[e] for e in emotions], dtype=np.int64)
+
+def _choice_table(key):
+    options = [possible_values[e][key] for e in emotions]
+    width = max(len(o) for o in options)
+    labels = np.array([[o[i % len(o)] for i in range(width)] for o in options])
+    return labels, np.array([len(o) for o in options])
+
+_age_ranges = np.array([possible_values[e]["age_group"] for e in emotions], dtype=np.int64)
+_heart_rate_ranges = np.array([[possible_values[e]["heart_rate"][s] for s in sizes] for e in emotions], dtype=np.float64)
+_bark_loudness_ranges = np.array([[possible_values[e]["bark_loudness"][s] for s in sizes] for e in emotions], dtype=np.float64)
+_tail_wag_speed_ranges = _range_table(tail_wag_speed_ranges)
+_tail_wag_amplitude_ranges = _range_table(tail_wag_amplitude_ranges)
+_bark_duration_ranges = _range_table({e: possible_values[e]["bark_duration"] for e in emotions})
+_head_tilt_ranges = _range_table({e: possible_values[e]["head_tilt"] for e in emotions})
+_max_steps = np.array([max_steps[s] for s in sizes], dtype=np.int64)
+_kcal_ranges = np.array([calorie_burn[s][0] for s in sizes], dtype=np.float64)
+_steps_divisors = np.array([calorie_burn[s][1] for s in sizes], dtype=np.float64)
+_sizes = np.array(sizes)
+_activities = np.array(activities)
+_choices = {key: _choice_table(key) for key in ["tail_position", "tail_stiffness", "wag_direction", "context"]}
+
+def _sample_choice(rng, key, emotion_idx):
+    labels, counts = _choices[key]
+    picks = (rng.random(len(emotion_idx)) * counts[emotion_idx]).astype(np.intp)
+    return labels[emotion_idx, picks]
+
+def _sample_randint_sum(rng, table, emotion_idx):
+    ranges = table[emotion_idx]
+    base = rng.integers(ranges[:, 0, 0], ranges[:, 0, 1], endpoint=True)
+    jitter = rng.integers(ranges[:, 1, 0], ranges[:, 1, 1], endpoint=True)
+    return base + jitter
+
+def _sample_uniform(rng, ranges):
+    return np.round(rng.uniform(ranges[..., 0], ranges[..., 1]), 2)
+
+# Generates n readings at once as columnar arrays (or a DataFrame with
+# as_frame=True) with the same columns and distributions as
+# retrieve_client_data. `seed` may be an int or an np.random.Generator.
+def generate_client_data_batch(n, seed=None, as_frame=False):
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    emotion_idx = rng.integers(0, len(emotions), n)
+    size_idx = rng.integers(0, len(sizes), n)
+    age_ranges = _age_ranges[emotion_idx]
+    age = rng.integers(age_ranges[:, 0], age_ranges[:, 1], endpoint=True)
+    bracket = np.where(age < 1, 0, np.where(age > 7, 1, 2))
+
+    heart_rate = _sample_uniform(rng, _heart_rate_ranges[emotion_idx, size_idx])
+    heart_rate += np.where(age < 1, 15, np.where(age > 7, -5, 0))
+    heart_rate = np.round(heart_rate + rng.integers(-15, 15, n, endpoint=True))
+
+    bark_pitch = np.where(size_idx == sizes.index("Large"), 30, 40) + rng.integers(-15, 15, n, endpoint=True)
+    bark_loudness = _sample_uniform(rng, _bark_loudness_ranges[emotion_idx, size_idx])
+    bark_loudness = np.round(bark_loudness + rng.integers(-15, 15, n, endpoint=True), 2)
+
+    steps = rng.integers(0, _max_steps[size_idx, bracket], endpoint=True)
+    calories = _sample_uniform(rng, _kcal_ranges[size_idx]) / 0.4 * steps / _steps_divisors[size_idx] * 0.8
+
+    columns = {
+        "size": _sizes[size_idx],
+        "age": age,
+        "heart_rate": heart_rate,
+        "tail_wag_speed": np.round(_sample_randint_sum(rng, _tail_wag_speed_ranges, emotion_idx) / 100.0, 2),
+        "tail_wag_amplitude": _sample_randint_sum(rng, _tail_wag_amplitude_ranges, emotion_idx),
+        "tail_position": _sample_choice(rng, "tail_position", emotion_idx),
+        "tail_stiffness": _sample_choice(rng, "tail_stiffness", emotion_idx),
+        "wag_direction": _sample_choice(rng, "wag_direction", emotion_idx),
+        "bark_pitch": bark_pitch,
+        "bark_loudness": bark_loudness,
+        "bark_duration": np.round(_sample_randint_sum(rng, _bark_duration_ranges, emotion_idx) / 100.0, 2),
+        "head_tilt": np.round(_sample_randint_sum(rng, _head_tilt_ranges, emotion_idx) / 100.0, 2),
+        "context": _sample_choice(rng, "context", emotion_idx),
+        "activity": _activities[rng.integers(0, len(activities), n)],
+        "steps": steps,
+        "latitude": np.round(rng.uniform(*latitude_range, n), 2),
+        "longitude": np.round(rng.uniform(*longitude_range, n), 2),
+        "temperature": np.round(rng.uniform(*temperature_range, n), 2),
+        "calories": np.round(calories, 2),
     }
+    if as_frame:
+        return pd.DataFrame(columns)
+    return columns
@@ -0,0 +1,103 @@
+import numpy as np
+
+# Feature order used when training machine-learning/model.py
+DEFAULT_FEATURES = [
+    'size', 'age', 'heart_rate', 'tail_wag_speed', 'tail_wag_amplitude', 'tail_position',
+    'tail_stiffness', 'wag_direction', 'bark_pitch', 'bark_loudness', 'bark_duration', 'head_tilt',
+]
+
+
+class EncodingError(ValueError):
+    pass
+
+
+_MISSING = object()
+
+
+# Turns collar readings into model input rows without going through pandas.
+# The category -> code tables are built once from the fitted LabelEncoders, so
+# encoding a reading is one dict lookup per categorical feature.
+class FeatureEncoder:
+    def __init__(self, label_encoders, features=None, categories=None):
+        self.features = list(features if features is not None else DEFAULT_FEATURES)
+        if categories is None:
+            categories = {col: le.classes_ for col, le in label_encoders.items()}
+        self.lookups = {
+            col: {category: code for code, category in enumerate(classes)}
+            for col, classes in categories.items() if col in self.features
+        }
+        self._columns = [(i, col, self.lookups.get(col)) for i, col in enumerate(self.features)]
+
+    @classmethod
+    def for_model(cls, model, label_encoders):
+        return cls(label_encoders, getattr(model, 'feature_names_in_', None))
+
+    # From the category lists of a native model manifest ({column: classes})
+    @classmethod
+    def from_categories(cls, categories, features):
+        return cls(None, features, categories)
+
+    def _encode_value(self, col, lookup, reading):
+        try:
+            value = reading[col]
+        except KeyError:
+            raise EncodingError(f"Missing feature: {col}") from None
+        except TypeError:
+            raise EncodingError("Reading must be a JSON object") from None
+        if lookup is not None:
+            try:
+                return lookup[value]
+            except (KeyError, TypeError):
+                raise EncodingError(f"Unknown {col}: {value!r} (expected one of {sorted(lookup)})") from None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise EncodingError(f"Feature {col} must be a number, got {value!r}") from None
+
+    # Encodes one reading into a (1, n_features) float32 row
+    def encode(self, reading, out=None):
+        row = np.empty((1, len(self.features)), dtype=np.float32) if out is None else out
+        for i, col, lookup in self._columns:
+            row[0, i] = self._encode_value(col, lookup, reading)
+        return row
+
+    # Encodes many readings into a contiguous float32 matrix, one column at a
+    # time: a single pass of dict lookups (or one float conversion) per
+    # feature over the whole batch. Rows that fail are re-encoded one value at
+    # a time for their error message. Returns the matrix of valid rows, their
+    # positions in `readings`, and {position: message} for every reading that
+    # could not be encoded.
+    def encode_many(self, readings):
+        n = len(readings)
+        matrix = np.empty((n, len(self.features)), dtype=np.float32)
+        errors = {r: "Reading must be a JSON object" for r, reading in enumerate(readings)
+                  if not isinstance(reading, dict)}
+        rows = [reading if isinstance(reading, dict) else {} for reading in readings]
+        for i, col, lookup in self._columns:
+            values = [row.get(col, _MISSING) for row in rows]
+            try:
+                if lookup is not None:
+                    column = np.fromiter((lookup.get(value, -1) for value in values), dtype=np.float32, count=n)
+                    failed = np.flatnonzero(column < 0)
+                else:
+                    column = np.array(values, dtype=np.float32)
+                    if column.shape != (n,):
+                        raise ValueError
+                    failed = ()
+            except (TypeError, ValueError):
+                # An unhashable category or a non-numeric value somewhere in
+                # the column: fall back to encoding it row by row
+                column = np.zeros(n, dtype=np.float32)
+                failed = range(n)
+            for r in failed:
+                if r in errors:
+                    continue
+                try:
+                    column[r] = self._encode_value(col, lookup, rows[r])
+                except EncodingError as e:
+                    errors[r] = str(e)
+            matrix[:, i] = column
+        if errors:
+            positions = np.array([r for r in range(n) if r not in errors], dtype=np.intp)
+            return matrix[positions], positions, errors
+        return matrix, np.arange(n), errors
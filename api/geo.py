@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+DEFAULT_CELL_DEGREES = 0.01  # about 1.1 km north-south
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+# Fixed lat/long grid over incoming readings. Cells are (row, col) =
+# floor(lat / cell_degrees), floor(lon / cell_degrees) and only occupied
+# cells are stored:
+#   - fleet_counts: readings per cell, for every collar
+#   - heatmaps: readings per cell for each collar
+#   - positions / occupants: each collar's last known position, and the
+#     collars whose last position is in each cell
+# Queries visit the cells overlapping the query area (or the occupied cells,
+# if there are fewer), never the individual readings.
+class GeoIndex:
+    def __init__(self, cell_degrees=DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.fleet_counts = {}
+        self.heatmaps = {}
+        self.positions = {}
+        self.occupants = {}
+        self._heatmap_cache = {}
+        self._lock = threading.Lock()
+
+    def cell(self, lat, lon):
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def cell_center(self, cell):
+        return (cell[0] + 0.5) * self.cell_degrees, (cell[1] + 0.5) * self.cell_degrees
+
+    def __contains__(self, collar_id):
+        return collar_id in self.positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    # Adds readings (dicts with "latitude"/"longitude"), each from
+    # collar_ids[i]; readings without a valid position are skipped.
+    # Returns the number of readings indexed.
+    def record_many(self, collar_ids, readings, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        lat = np.array([_coordinate(r.get('latitude')) for r in readings], dtype=np.float64)
+        lon = np.array([_coordinate(r.get('longitude')) for r in readings], dtype=np.float64)
+        valid = (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        rows = np.floor(lat / self.cell_degrees)
+        cols = np.floor(lon / self.cell_degrees)
+        indexed = 0
+        with self._lock:
+            for i in np.flatnonzero(valid):
+                self._add(collar_ids[i], float(lat[i]), float(lon[i]), (int(rows[i]), int(cols[i])), timestamp)
+                indexed += 1
+        return indexed
+
+    def record(self, collar_id, reading, timestamp=None):
+        return self.record_many([collar_id], [reading], timestamp)
+
+    def _add(self, collar_id, lat, lon, cell, timestamp):
+        self.fleet_counts[cell] = self.fleet_counts.get(cell, 0) + 1
+        heatmap = self.heatmaps.setdefault(collar_id, {})
+        heatmap[cell] = heatmap.get(cell, 0) + 1
+        self._heatmap_cache.pop(collar_id, None)
+
+        previous = self.positions.get(collar_id)
+        if previous is not None and previous[3] != cell:
+            occupants = self.occupants[previous[3]]
+            occupants.discard(collar_id)
+            if not occupants:
+                del self.occupants[previous[3]]
+        self.occupants.setdefault(cell, set()).add(collar_id)
+        self.positions[collar_id] = (lat, lon, timestamp, cell)
+
+    # Occupied cells (keys of `cells`) within the given cell-index ranges
+    def _cells_in(self, cells, row_lo, row_hi, col_lo, col_hi):
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) <= len(cells):
+            return [(r, c) for r in range(row_lo, row_hi + 1) for c in range(col_lo, col_hi + 1) if (r, c) in cells]
+        return [cell for cell in cells if row_lo <= cell[0] <= row_hi and col_lo <= cell[1] <= col_hi]
+
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon):
+        (row_lo, col_lo), (row_hi, col_hi) = self.cell(min_lat, min_lon), self.cell(max_lat, max_lon)
+        collars = []
+        for cell in self._cells_in(self.occupants, row_lo, row_hi, col_lo, col_hi):
+            collars.extend(self.occupants[cell])
+        return collars
+
+    def _describe(self, collars):
+        return [{"collar": collar_id,
+                 "latitude": self.positions[collar_id][0],
+                 "longitude": self.positions[collar_id][1],
+                 "last_seen": self.positions[collar_id][2]} for collar_id in collars]
+
+    # Collars whose last known position is inside the box
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        with self._lock:
+            collars = [collar_id for collar_id in self._candidates(min_lat, min_lon, max_lat, max_lon)
+                       if min_lat <= self.positions[collar_id][0] <= max_lat
+                       and min_lon <= self.positions[collar_id][1] <= max_lon]
+            return self._describe(sorted(collars))
+
+    # Collars whose last known position is within radius_m of the point,
+    # nearest first
+    def within_radius(self, lat, lon, radius_m):
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        cos_lat = math.cos(math.radians(lat))
+        dlon = 180.0 if cos_lat < 1e-9 else min(180.0, dlat / cos_lat)
+        with self._lock:
+            candidates = self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+            if not candidates:
+                return []
+            points = np.array([self.positions[c][:2] for c in candidates])
+            distances = haversine_m(lat, lon, points[:, 0], points[:, 1])
+            order = np.argsort(distances, kind='stable')
+            nearby = [i for i in order if distances[i] <= radius_m]
+            results = self._describe([candidates[i] for i in nearby])
+        for result, i in zip(results, nearby):
+            result["distance_m"] = round(float(distances[i]), 1)
+        return results
+
+    # Fleet-wide reading counts for the occupied cells inside the box
+    def density(self, min_lat, min_lon, max_lat, max_lon):
+        (row_lo, col_lo), (row_hi, col_hi) = self.cell(min_lat, min_lon), self.cell(max_lat, max_lon)
+        with self._lock:
+            cells = self._cells_in(self.fleet_counts, row_lo, row_hi, col_lo, col_hi)
+            return self._cell_list({cell: self.fleet_counts[cell] for cell in cells})
+
+    # Where a collar spends its time: readings per cell, busiest first. The
+    # list is kept until the collar's next reading.
+    def heatmap(self, collar_id):
+        with self._lock:
+            cached = self._heatmap_cache.get(collar_id)
+            if cached is None:
+                cached = self._heatmap_cache[collar_id] = self._cell_list(self.heatmaps[collar_id])
+            return cached
+
+    def _cell_list(self, counts):
+        cells = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return [{"latitude": round(lat, 6), "longitude": round(lon, 6), "count": count}
+                for cell, count in cells for lat, lon in [self.cell_center(cell)]]
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
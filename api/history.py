@@ -0,0 +1,192 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_WINDOWS = (60, 600, 3600)
+# Largest values the ring buffer columns can hold
+LIMITS = {'heart_rate': float(np.finfo(np.float32).max),
+          'steps': float(np.iinfo(np.int32).max),
+          'calories': float(np.finfo(np.float32).max)}
+
+
+# The (heart_rate, steps, calories) of a reading as stored in the history.
+# Missing and NaN values count as 0; raises ValueError for values that are
+# not numbers or don't fit the buffer.
+def telemetry_values(reading):
+    values = []
+    for name, limit in LIMITS.items():
+        value = reading.get(name)
+        if value is None:
+            values.append(0.0)
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{name} must be a number, got {value!r}") from None
+        if math.isnan(number):
+            number = 0.0
+        elif not abs(number) <= limit:
+            raise ValueError(f"{name} is out of range: {value!r}")
+        values.append(number)
+    heart_rate, steps, calories = values
+    return heart_rate, int(steps), calories
+
+
+# Buckets per window; a window's oldest bucket may reach back up to
+# seconds / BUCKETS further than the window itself
+BUCKETS = 60
+# Bucket slots per window: the BUCKETS + 1 buckets a window can span, and
+# one spare for rounding at the bucket edges
+SLOTS = BUCKETS + 2
+NO_BUCKET = np.iinfo(np.int64).min
+
+
+# Running aggregates over the readings of the last `seconds` seconds, kept
+# as per-bucket sums in time buckets of seconds / BUCKETS. Bucket b lives in
+# slot b % SLOTS of preallocated arrays:
+#   index[s]      the bucket held by slot s
+#   sums[s]       heart rate sum, max heart rate, steps, calories
+#   emotions[s]   readings per emotion (their total is the count)
+# A slot is reset when a newer bucket takes it over, and a query sums the
+# slots whose bucket is still inside the window. The buckets don't depend on
+# the collar's ring buffer, so a window covers its whole span even when it
+# has seen more readings than the buffer holds.
+class _Window:
+    __slots__ = ('seconds', 'width', 'index', 'sums', 'emotions')
+
+    def __init__(self, seconds, n_emotions):
+        self.seconds = seconds
+        self.width = seconds / BUCKETS
+        self.index = np.full(SLOTS, NO_BUCKET, dtype=np.int64)
+        self.sums = np.zeros((SLOTS, 4))
+        self.emotions = np.zeros((SLOTS, n_emotions), dtype=np.int32)
+
+    def add(self, timestamp, heart_rate, steps, calories, emotion):
+        bucket = math.floor(timestamp / self.width)
+        slot = bucket % SLOTS
+        sums = self.sums[slot]
+        if self.index[slot] != bucket:
+            self.index[slot] = bucket
+            sums[:] = (0.0, heart_rate, 0.0, 0.0)
+            self.emotions[slot] = 0
+        sums[0] += heart_rate
+        if heart_rate > sums[1]:
+            sums[1] = heart_rate
+        sums[2] += steps
+        sums[3] += calories
+        self.emotions[slot, emotion] += 1
+
+    def totals(self, now, emotion_labels):
+        live = self.index >= math.floor((now - self.seconds) / self.width)
+        emotions = self.emotions[live].sum(axis=0)
+        count = int(emotions.sum())
+        heart_rate_sum, _, steps, calories = self.sums[live].sum(axis=0)
+        return {
+            'count': count,
+            'mean_heart_rate': round(float(heart_rate_sum) / count, 2) if count else None,
+            'max_heart_rate': float(self.sums[live, 1].max()) if count else None,
+            'steps': int(steps),
+            'calories': round(float(calories), 2),
+            'emotions': {label: int(n) for label, n in zip(emotion_labels, emotions) if n},
+        }
+
+
+# Fixed-size ring buffer of one collar's recent readings, stored column-wise,
+# plus the collar's windows
+class CollarHistory:
+    def __init__(self, capacity, windows, n_emotions):
+        self.capacity = capacity
+        self.next_seq = 0
+        self.timestamp = np.zeros(capacity, dtype=np.float64)
+        self.heart_rate = np.zeros(capacity, dtype=np.float32)
+        self.steps = np.zeros(capacity, dtype=np.int32)
+        self.calories = np.zeros(capacity, dtype=np.float32)
+        self.emotion = np.zeros(capacity, dtype=np.int8)
+        self.windows = [_Window(seconds, n_emotions) for seconds in windows]
+        self._lock = threading.Lock()
+
+    def append(self, timestamp, heart_rate, steps, calories, emotion):
+        with self._lock:
+            if self.next_seq:
+                timestamp = max(timestamp, self.timestamp[(self.next_seq - 1) % self.capacity])
+            i = self.next_seq % self.capacity
+            self.timestamp[i] = timestamp
+            self.heart_rate[i] = heart_rate
+            self.steps[i] = steps
+            self.calories[i] = calories
+            self.emotion[i] = emotion
+            self.next_seq += 1
+
+            # Windows sum the stored (rounded) values, like recent() reports them
+            heart_rate, steps, calories = float(self.heart_rate[i]), int(self.steps[i]), float(self.calories[i])
+            for window in self.windows:
+                window.add(float(timestamp), heart_rate, steps, calories, emotion)
+
+    def aggregates(self, now, emotion_labels):
+        with self._lock:
+            return {f'{window.seconds}s': window.totals(now, emotion_labels) for window in self.windows}
+
+    def recent(self, limit, emotion_labels):
+        with self._lock:
+            n = min(limit, self.next_seq, self.capacity)
+            order = np.arange(self.next_seq - n, self.next_seq) % self.capacity
+            return {
+                'timestamp': self.timestamp[order].tolist(),
+                'heart_rate': [round(x, 2) for x in self.heart_rate[order].tolist()],
+                'steps': self.steps[order].tolist(),
+                'calories': [round(x, 2) for x in self.calories[order].tolist()],
+                'emotion': [emotion_labels[e] for e in self.emotion[order]],
+            }
+
+
+# In-process telemetry history for every collar, `capacity` readings each.
+# Memory per collar is fixed: 21 bytes per ring buffer slot, plus
+# SLOTS * (40 + 4 * emotions) bytes per window (about 4 KB with 7 emotions).
+# With the defaults that is about 18 KB per collar.
+class HistoryStore:
+    def __init__(self, emotion_labels, capacity=256, windows=DEFAULT_WINDOWS):
+        self.emotion_labels = list(emotion_labels)
+        self.emotion_codes = {label: i for i, label in enumerate(self.emotion_labels)}
+        self.capacity = capacity
+        self.windows = tuple(sorted(windows))
+        self._collars = {}
+        self._lock = threading.Lock()
+
+    def _collar(self, collar_id):
+        history = self._collars.get(collar_id)
+        if history is None:
+            with self._lock:
+                history = self._collars.get(collar_id)
+                if history is None:
+                    history = CollarHistory(self.capacity, self.windows, len(self.emotion_labels))
+                    self._collars[collar_id] = history
+        return history
+
+    # Raises ValueError (before storing anything) for a reading that
+    # telemetry_values() rejects
+    def record(self, collar_id, reading, emotion, timestamp=None):
+        heart_rate, steps, calories = telemetry_values(reading)
+        if timestamp is None:
+            timestamp = reading.get('timestamp')
+            if not isinstance(timestamp, (int, float)) or not math.isfinite(timestamp):
+                timestamp = time.time()
+        self._collar(collar_id).append(float(timestamp), heart_rate, steps, calories, self.emotion_codes[emotion])
+
+    def __contains__(self, collar_id):
+        return collar_id in self._collars
+
+    def __len__(self):
+        return len(self._collars)
+
+    def summary(self, collar_id, limit=0, now=None):
+        history = self._collars[collar_id]
+        result = {
+            'collar': collar_id,
+            'readings': min(history.next_seq, history.capacity),
+            'windows': history.aggregates(time.time() if now is None else now, self.emotion_labels),
+        }
+        if limit:
+            result['recent'] = history.recent(limit, self.emotion_labels)
+        return result
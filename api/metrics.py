@@ -0,0 +1,126 @@
+import bisect
+import json
+import logging
+import os
+import random
+import threading
+
+# Latency buckets in seconds, from 50us to 5s
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {value}')
+        return lines
+
+
+# Fixed-bucket histogram. observe() is a bisect plus a few additions under a
+# lock, so it costs well under a microsecond.
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        for label_values, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {series[-1]}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, labels=()):
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    # Prometheus text exposition format
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+stage_seconds = registry.histogram('pawsense_stage_seconds', 'Time spent in each inference stage.',
+                                   labels=('path', 'stage'))
+request_seconds = registry.histogram('pawsense_request_seconds', 'Request latency by endpoint.',
+                                     labels=('endpoint',))
+requests_total = registry.counter('pawsense_requests_total', 'Requests by endpoint and status code.',
+                                  labels=('endpoint', 'status'))
+errors_total = registry.counter('pawsense_errors_total', 'Prediction errors by exception type.',
+                                labels=('path', 'type'))
+emotions_total = registry.counter('pawsense_predicted_emotions_total', 'Predicted emotions.',
+                                  labels=('emotion',))
+anomalies_total = registry.counter('pawsense_vital_anomalies_total', 'Readings flagged as abnormal for the dog, by vital.',
+                                   labels=('vital',))
+
+
+# Structured (JSON) log lines for per-request events, emitted for only a
+# sample of requests (PAWSENSE_LOG_SAMPLE_RATE, default 1%)
+logger = logging.getLogger('pawsense')
+log_sample_rate = float(os.environ.get('PAWSENSE_LOG_SAMPLE_RATE', 0.01))
+
+
+def log_sampled(event, **fields):
+    if log_sample_rate < 1 and random.random() >= log_sample_rate:
+        return
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'event': event, **fields}, default=str))
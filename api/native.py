@@ -0,0 +1,55 @@
+import json
+import os
+
+import numpy as np
+import xgboost as xgb
+
+MANIFEST_NAME = 'model_manifest.json'
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def read_manifest(directory):
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+    for key in ('model_file', 'features', 'categories', 'classes'):
+        if key not in manifest:
+            raise ManifestError(f"{MANIFEST_NAME} has no {key!r}")
+    return manifest
+
+
+# A booster loaded from the native export of machine-learning/model.py
+# (model.ubj / model.json plus model_manifest.json). Predicts with
+# inplace_predict straight on float32 arrays, so there is no DataFrame
+# validation or DMatrix construction per call. Offers the same predict /
+# predict_proba / feature_names_in_ as the XGBClassifier it replaces.
+class NativeModel:
+    def __init__(self, directory, manifest=None, nthread=1):
+        self.manifest = manifest if manifest is not None else read_manifest(directory)
+        self.booster = xgb.Booster(model_file=os.path.join(directory, self.manifest['model_file']))
+        self.booster.set_param({'nthread': nthread})
+        self.nthread = nthread
+        self.feature_names_in_ = np.array(self.manifest['features'])
+        self.classes = list(self.manifest['classes'])
+        iteration_range = self.manifest.get('iteration_range')
+        self.iteration_range = tuple(iteration_range) if iteration_range else (0, 0)
+        if self.booster.num_features() != len(self.feature_names_in_):
+            raise ManifestError(f"Booster has {self.booster.num_features()} features, "
+                                f"the manifest lists {len(self.feature_names_in_)}")
+
+    # (n, n_classes) class probabilities for an (n, n_features) float32 array
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        output = self.booster.inplace_predict(X, iteration_range=self.iteration_range,
+                                              predict_type='value', validate_features=False)
+        if output.ndim == 1:
+            # multi:softmax returns labels only
+            probabilities = np.zeros((len(output), len(self.classes)), dtype=np.float32)
+            probabilities[np.arange(len(output)), output.astype(np.intp)] = 1.0
+            return probabilities
+        return output
+
+    def predict(self, X):
+        return np.argmax(self.predict_proba(X), axis=1)
@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import joblib
+
+from encoder import FeatureEncoder
+from native import MANIFEST_NAME, NativeModel, read_manifest
+from scheduler import InferenceScheduler
+
+ARTIFACTS = ('model.joblib', 'label_encoders.joblib', 'target_le.joblib')
+# Every file that can make up a bundle, watched for changes
+WATCHED = (MANIFEST_NAME, 'model.ubj', 'model.json') + ARTIFACTS
+
+logger = logging.getLogger('pawsense')
+
+
+class ModelLoadError(Exception):
+    pass
+
+
+# Short content hash of a bundle's artifact files, used as its version
+def artifact_version(directory, names=ARTIFACTS):
+    digest = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(directory, name), 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+# A model with everything needed to serve it: its encoders, emotion labels
+# and its own inference scheduler, so a batch never mixes two models.
+# The native export (model_manifest.json) is used when present, unless
+# prefer_native is off; otherwise the pickled XGBClassifier and encoders.
+class ModelBundle:
+    def __init__(self, directory, prefer_native=True, nthread=1):
+        self.directory = directory
+        if prefer_native and os.path.exists(os.path.join(directory, MANIFEST_NAME)):
+            manifest = read_manifest(directory)
+            self.format = manifest.get('format', 'native')
+            self.version = artifact_version(directory, (MANIFEST_NAME, manifest['model_file']))
+            self.model = NativeModel(directory, manifest, nthread)
+            self.emotion_labels = self.model.classes
+            self.feature_encoder = FeatureEncoder.from_categories(manifest['categories'], manifest['features'])
+        else:
+            self.format = 'joblib'
+            self.version = artifact_version(directory)
+            self.model = joblib.load(os.path.join(directory, 'model.joblib'))
+            label_encoders = joblib.load(os.path.join(directory, 'label_encoders.joblib'))
+            target_le = joblib.load(os.path.join(directory, 'target_le.joblib'))
+            self.emotion_labels = [str(label) for label in target_le.classes_]
+            self.feature_encoder = FeatureEncoder.for_model(self.model, label_encoders)
+        # Rows from concurrent requests are batched into predict_proba
+        self.scheduler = InferenceScheduler.from_env(self.model.predict_proba)
+        self.loaded_at = time.time()
+
+    # A reading made of the first known category of each feature and zeros
+    def sample_reading(self):
+        sample = {col: 0 for col in self.feature_encoder.features}
+        for col, lookup in self.feature_encoder.lookups.items():
+            sample[col] = next(iter(lookup))
+        return sample
+
+    # Runs a prediction through the model and checks that it gives one
+    # probability per emotion label
+    def warm_up(self):
+        probabilities = self.model.predict_proba(self.feature_encoder.encode(self.sample_reading()))
+        if probabilities.shape != (1, len(self.emotion_labels)):
+            raise ModelLoadError(f"Warm-up prediction has shape {probabilities.shape}, expected "
+                                 f"(1, {len(self.emotion_labels)}) for the emotion labels")
+        return self.emotion_labels[int(probabilities[0].argmax())]
+
+    def describe(self):
+        return {"version": self.version,
+                "format": self.format,
+                "directory": self.directory,
+                "loaded_at": self.loaded_at,
+                "emotion_labels": self.emotion_labels,
+                "features": [str(f) for f in self.feature_encoder.features]}
+
+
+# Serves the current ModelBundle and replaces it when the artifacts change on
+# disk (checked at most every `check_interval` seconds, loaded on a
+# background thread) or when reload() is called. A new bundle must load and
+# pass a warm-up prediction before it is swapped in; until then, and if it
+# fails, requests keep using the current one. The previous bundle is kept
+# for rollback().
+#
+# Callers take one bundle from current() per request and use it for
+# encoding, prediction and labels, so a swap mid-request is harmless.
+class ModelRegistry:
+    def __init__(self, directory, check_interval=10.0, emotion_labels=None, prefer_native=True, nthread=1):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.prefer_native = prefer_native
+        self.nthread = nthread
+        self._lock = threading.Lock()
+        self._loading = None
+        self._next_check = 0.0
+        self._signature = self._files_signature()
+        self.previous = None
+        self.bundle = self._load()
+        # Labels are fixed for the life of the process (history and metrics
+        # are keyed by them); a model with other labels needs a restart
+        self.emotion_labels = list(emotion_labels or self.bundle.emotion_labels)
+        self.last_error = None
+
+    @classmethod
+    def from_env(cls, directory):
+        interval = float(os.environ.get('PAWSENSE_MODEL_CHECK_INTERVAL', 10))
+        return cls(directory, check_interval=interval if interval > 0 else None,
+                   prefer_native=os.environ.get('PAWSENSE_NATIVE_MODEL', '1') != '0',
+                   nthread=int(os.environ.get('PAWSENSE_INFERENCE_NTHREAD', 1)))
+
+    def _files_signature(self):
+        signature = []
+        for name in WATCHED:
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                signature.append((name, None, None))
+            else:
+                signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self):
+        try:
+            bundle = ModelBundle(self.directory, self.prefer_native, self.nthread)
+            bundle.warm_up()
+        except ModelLoadError:
+            raise
+        except Exception as e:
+            raise ModelLoadError(f"Could not load model from {self.directory}: {e}") from e
+        return bundle
+
+    def _swap(self, bundle):
+        if bundle.emotion_labels != self.emotion_labels:
+            raise ModelLoadError(f"Model {bundle.version} predicts {bundle.emotion_labels}, "
+                                 f"expected {self.emotion_labels}; restart the API to change labels")
+        with self._lock:
+            if bundle.version == self.bundle.version:
+                return self.bundle
+            retired, self.previous, self.bundle = self.previous, self.bundle, bundle
+        # The bundle two versions back can't be in use by a request any more
+        if retired is not None:
+            retired.scheduler.close()
+        logger.info("Serving model %s (previous %s)", bundle.version, self.previous.version)
+        return bundle
+
+    # Loads the artifacts now and swaps them in; raises ModelLoadError and
+    # keeps the current bundle if they don't load or warm up
+    def reload(self):
+        signature = self._files_signature()
+        try:
+            bundle = self._swap(self._load())
+        except ModelLoadError as e:
+            self.last_error = str(e)
+            raise
+        self._signature = signature
+        self.last_error = None
+        return bundle
+
+    def rollback(self):
+        with self._lock:
+            if self.previous is None:
+                raise ModelLoadError("No previous model to roll back to")
+            self.bundle, self.previous = self.previous, self.bundle
+            bundle = self.bundle
+        logger.info("Rolled back to model %s", bundle.version)
+        return bundle
+
+    def _reload_in_background(self, signature):
+        try:
+            self.reload()
+        except ModelLoadError as e:
+            self._signature = signature
+            logger.warning("Keeping model %s: %s", self.bundle.version, e)
+        finally:
+            self._loading = None
+
+    def refresh_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check or self._loading is not None:
+            return False
+        self._next_check = now + self.check_interval
+        signature = self._files_signature()
+        if signature == self._signature:
+            return False
+        with self._lock:
+            if self._loading is not None:
+                return False
+            self._loading = threading.Thread(target=self._reload_in_background, args=(signature,),
+                                             name='model-reload', daemon=True)
+        self._loading.start()
+        return True
+
+    def current(self):
+        if self.check_interval is not None:
+            self.refresh_if_changed()
+        return self.bundle
+
+    def describe(self):
+        return {"current": self.bundle.describe(),
+                "previous": self.previous.describe() if self.previous else None,
+                "loading": self._loading is not None,
+                "last_error": self.last_error}
@@ -0,0 +1,135 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# Collects encoded rows from concurrent requests and runs them through the
+# model as one batch once `max_batch_size` rows are queued or the oldest row
+# has waited `max_wait` seconds, whichever comes first.
+#
+# With `adaptive` (the default) the wait only applies under concurrent load:
+# rows already queued are always taken, but a lone row is predicted at once
+# unless the previous batch also had company, so an uncontended request
+# doesn't pay max_wait.
+class InferenceScheduler:
+    def __init__(self, predict_fn, max_batch_size=64, max_wait=0.002, adaptive=True):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.adaptive = adaptive
+        self._contended = False
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._closed = False
+        self._batches = 0
+        self._rows = 0
+        self._largest_batch = 0
+        self._batch_sizes = np.zeros(max_batch_size + 1, dtype=np.int64)
+        self._buffer = None  # batch input, reused by the worker thread
+
+    @classmethod
+    def from_env(cls, predict_fn):
+        return cls(predict_fn,
+                   max_batch_size=int(os.environ.get('PAWSENSE_BATCH_SIZE', 64)),
+                   max_wait=float(os.environ.get('PAWSENSE_BATCH_WAIT_MS', 2)) / 1000,
+                   adaptive=os.environ.get('PAWSENSE_BATCH_ADAPTIVE', '1') != '0')
+
+    # The worker thread is started on first use, and again in a forked child,
+    # since threads do not survive fork(). Each worker reads its own queue.
+    # Called with _lock held.
+    def _ensure_worker(self):
+        if self._worker_pid != os.getpid() or not self._worker.is_alive():
+            self._queue = queue.SimpleQueue()
+            self._worker = threading.Thread(target=self._run, args=(self._queue,), name='inference-scheduler',
+                                             daemon=True)
+            self._worker.start()
+            self._worker_pid = os.getpid()
+
+    # Queues one (1, n_features) row and returns a Future for its prediction.
+    # Raises RuntimeError once the scheduler is closed.
+    def submit(self, row):
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Inference scheduler is closed")
+            self._ensure_worker()
+            self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    def _next_batch(self, rows):
+        batch = [rows.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(rows.get_nowait())
+            except queue.Empty:
+                break
+        if not (self.adaptive and len(batch) == 1 and not self._contended):
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(rows.get(timeout=remaining) if remaining > 0 else rows.get_nowait())
+                except queue.Empty:
+                    break
+        self._contended = len(batch) > 1
+        return batch
+
+    # Stops the worker once the rows queued so far are predicted; rows
+    # submitted afterwards are rejected
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._worker is not None and self._worker.is_alive():
+                self._queue.put(None)
+
+    def _run(self, rows):
+        while True:
+            batch = self._next_batch(rows)
+            stop = None in batch
+            batch = [(row, future) for row, future in filter(None, batch) if future.set_running_or_notify_cancel()]
+            if batch:
+                self._predict_batch(batch)
+            if stop:
+                return
+
+    def _predict_batch(self, batch):
+        rows = [row for row, _ in batch]
+        if self._buffer is None or self._buffer.shape[1:] != rows[0].shape[1:] or self._buffer.dtype != rows[0].dtype:
+            self._buffer = np.empty((self.max_batch_size,) + rows[0].shape[1:], dtype=rows[0].dtype)
+        try:
+            predictions = self.predict_fn(np.concatenate(rows, out=self._buffer[:len(rows)]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for (_, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
+        with self._lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._batch_sizes[len(batch)] += 1
+
+    def stats(self):
+        with self._lock:
+            sizes = {int(size): int(count) for size, count in enumerate(self._batch_sizes) if count}
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'adaptive': self.adaptive,
+                'batches': self._batches,
+                'rows': self._rows,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'batch_size_counts': sizes,
+            }
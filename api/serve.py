@@ -0,0 +1,112 @@
+# Production entry point: python serve.py [--workers N]
+#
+# The parent process imports the app (model, encoders and activity store),
+# warms it up, then forks the workers. The workers share the loaded objects
+# copy-on-write and accept connections from the same listening socket, so
+# memory does not grow N-fold with the number of workers.
+#
+# Limitation: the live state is kept per process and is not shared between
+# workers. That is the /stream subscribers, collar history, vitals
+# baselines, positions, logged /activity events, metrics and the
+# /model/reload and /model/rollback actions. With several workers a request
+# only sees what reached the same worker, e.g. an /ingest on one worker does
+# not reach /stream subscribers on another. So the default is one worker
+# (with threads); use --workers N > 1 only for stateless prediction traffic
+# (/data, /data/batch, /predict, /forecast).
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the PawSense API with pre-forked workers")
+    parser.add_argument('--host', default=os.environ.get('PAWSENSE_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PAWSENSE_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('PAWSENSE_WORKERS', 1)),
+                        help="worker processes (default 1); live state is not shared between workers")
+    parser.add_argument('--backlog', type=int, default=1024)
+    return parser.parse_args(argv)
+
+
+def listen(host, port, backlog):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, host, port, sock):
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def spawn_worker(app, host, port, sock):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, host, port, sock)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    import api
+    api.warm_up()
+
+    if not hasattr(os, 'fork') or args.workers <= 1:
+        make_server(args.host, args.port, api.app, threaded=True).serve_forever()
+        return
+
+    sock = listen(args.host, args.port, args.backlog)
+    # Move everything loaded so far out of the collector's generations so
+    # collections in the workers don't write to (and un-share) those pages
+    gc.freeze()
+
+    workers = {spawn_worker(api.app, args.host, args.port, sock) for _ in range(args.workers)}
+    print(f"Serving on {args.host}:{args.port} with {len(workers)} workers", flush=True)
+    print("Streams, history, vitals baselines, positions, activity stats, metrics and model admin actions "
+          "are per worker and not shared between the workers", file=sys.stderr, flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Replace workers that die until asked to stop
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting", file=sys.stderr, flush=True)
+            time.sleep(0.1)
+            workers.add(spawn_worker(api.app, args.host, args.port, sock))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import json
+import queue
+import threading
+from collections import defaultdict
+
+
+# Fans prediction results out to every client watching a collar. Each
+# subscriber gets its own bounded queue; a slow subscriber drops its oldest
+# events instead of holding up ingestion or the other subscribers.
+class PredictionBroker:
+    def __init__(self, max_pending=256):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, collar_id):
+        subscription = queue.Queue(maxsize=self.max_pending)
+        with self._lock:
+            self._subscribers[collar_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, collar_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(collar_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[collar_id]
+
+    def subscriber_count(self, collar_id):
+        with self._lock:
+            return len(self._subscribers.get(collar_id, ()))
+
+    def publish(self, collar_id, events):
+        with self._lock:
+            subscribers = list(self._subscribers.get(collar_id, ()))
+        for subscription in subscribers:
+            for event in events:
+                while True:
+                    try:
+                        subscription.put_nowait(event)
+                        break
+                    except queue.Full:
+                        try:
+                            subscription.get_nowait()
+                        except queue.Empty:
+                            pass
+        return len(subscribers)
+
+
+# Yields events for one subscriber as Server-Sent Events ("sse") or
+# newline-delimited JSON ("ndjson") until the client disconnects
+def stream_events(broker, collar_id, fmt="sse", keepalive=15.0):
+    subscription = broker.subscribe(collar_id)
+    try:
+        if fmt == "sse":
+            yield ": connected\n\n"
+        while True:
+            try:
+                event = subscription.get(timeout=keepalive)
+            except queue.Empty:
+                yield ": keep-alive\n\n" if fmt == "sse" else "\n"
+                continue
+            if fmt == "sse":
+                yield f"data: {json.dumps(event)}\n\n"
+            else:
+                yield json.dumps(event) + "\n"
+    finally:
+        broker.unsubscribe(collar_id, subscription)
+
+
+# Reads a newline-delimited JSON request body and yields lists of up to
+# `batch_size` parsed readings, plus the parse errors for that chunk
+def iter_ndjson_batches(stream, batch_size=64):
+    batch, errors = [], []
+    for line_number, line in enumerate(stream):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            batch.append(json.loads(line))
+        except ValueError as e:
+            errors.append({"line": line_number, "error": f"Invalid JSON: {e}"})
+        if len(batch) + len(errors) >= batch_size:
+            yield batch, errors
+            batch, errors = [], []
+    if batch or errors:
+        yield batch, errors
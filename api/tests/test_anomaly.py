@@ -0,0 +1,117 @@
+import numpy as np
+
+from anomaly import VITALS, VitalsMonitor
+
+ALPHA = 0.05
+
+
+# Readings for a few collars in random order, with some values missing
+def make_batch(n, n_collars=3, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal([100, 38.5, 5000, 60], [15, 0.4, 2000, 10], size=(n, len(VITALS)))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    collar_ids = [f"collar-{c}" for c in rng.integers(0, n_collars, n)]
+    return collar_ids, np.zeros(n, dtype=np.intp), values
+
+
+# One reading at a time, as the EWMA is defined: each vital starts from its
+# first value, missing values leave it unchanged
+def sequential_baselines(collar_ids, values):
+    baselines = {}
+    for collar_id, row in zip(collar_ids, values):
+        state = baselines.setdefault(collar_id, [[None, 0.0, 0] for _ in VITALS])
+        for v, x in enumerate(row):
+            if np.isnan(x):
+                continue
+            mean, var, count = state[v]
+            if mean is None:
+                mean = x
+            delta = x - mean
+            state[v] = [mean + ALPHA * delta, (1 - ALPHA) * (var + ALPHA * delta ** 2), count + 1]
+    return baselines
+
+
+def assert_matches(monitor, baselines):
+    for collar_id, state in baselines.items():
+        row = monitor._rows[collar_id]
+        np.testing.assert_allclose(monitor.mean[row], [s[0] for s in state], rtol=1e-9)
+        np.testing.assert_allclose(monitor.var[row], [s[1] for s in state], rtol=1e-7, atol=1e-12)
+        np.testing.assert_array_equal(monitor.count[row], [s[2] for s in state])
+
+
+def unclipped_monitor():
+    return VitalsMonitor(alpha=ALPHA, threshold=1e12)
+
+
+def test_batch_scan_matches_sequential_updates():
+    collar_ids, cohorts, values = make_batch(1500)
+    monitor = unclipped_monitor()
+    monitor.score(collar_ids, cohorts, values)
+    assert_matches(monitor, sequential_baselines(collar_ids, values))
+
+
+def test_scan_spans_several_blocks_of_one_collar():
+    n = 3 * VitalsMonitor.SCAN_BLOCK + 17
+    _, cohorts, values = make_batch(n, seed=1)
+    collar_ids = ['rex'] * n
+    monitor = unclipped_monitor()
+    monitor.score(collar_ids, cohorts, values)
+    assert_matches(monitor, sequential_baselines(collar_ids, values))
+
+
+# Once every collar is known (batches use the baselines from before the
+# batch, so new collars would be seeded from different cohort states)
+def test_batch_matches_one_reading_per_call():
+    collar_ids, cohorts, values = make_batch(600, seed=2)
+    batched, single = unclipped_monitor(), unclipped_monitor()
+    known = ['collar-0', 'collar-1', 'collar-2']
+    for monitor in (batched, single):
+        monitor.score(known, cohorts[:3], values[:3])
+    batched.score(collar_ids, cohorts, values)
+    for i in range(len(collar_ids)):
+        single.score(collar_ids[i:i + 1], cohorts[i:i + 1], values[i:i + 1])
+    for collar_id, row in batched._rows.items():
+        other = single._rows[collar_id]
+        np.testing.assert_allclose(batched.mean[row], single.mean[other], rtol=1e-9)
+        np.testing.assert_allclose(batched.var[row], single.var[other], rtol=1e-7)
+    np.testing.assert_allclose(batched.cohort_mean, single.cohort_mean, rtol=1e-9)
+    np.testing.assert_allclose(batched.cohort_m2, single.cohort_m2, rtol=1e-7)
+
+
+def test_cohort_statistics_match_direct_computation():
+    collar_ids, _, values = make_batch(900, seed=3)
+    cohorts = np.arange(900) % 4
+    monitor = unclipped_monitor()
+    for start in range(0, 900, 128):
+        monitor.score(collar_ids[start:start + 128], cohorts[start:start + 128], values[start:start + 128])
+    for cohort in range(4):
+        subset = values[cohorts == cohort]
+        np.testing.assert_array_equal(monitor.cohort_count[cohort], np.sum(~np.isnan(subset), axis=0))
+        np.testing.assert_allclose(monitor.cohort_mean[cohort], np.nanmean(subset, axis=0), rtol=1e-9)
+        np.testing.assert_allclose(monitor.cohort_m2[cohort] / monitor.cohort_count[cohort],
+                                   np.nanvar(subset, axis=0), rtol=1e-7)
+
+
+def test_vital_missing_from_first_reading_is_not_seeded_with_zero():
+    monitor = VitalsMonitor(alpha=ALPHA, min_cohort_samples=10 ** 9)
+    first = np.array([[100.0, np.nan, 5000.0, 60.0]])
+    monitor.score(['rex'], np.zeros(1, dtype=np.intp), first)
+    assert monitor.count[monitor._rows['rex'], 1] == 0
+
+    rng = np.random.default_rng(4)
+    later = np.column_stack([rng.normal(100, 5, 40), rng.normal(38.5, 0.2, 40),
+                             rng.normal(5000, 500, 40), rng.normal(60, 3, 40)])
+    flags, _, _ = monitor.score(['rex'] * 40, np.zeros(40, dtype=np.intp), later)
+    flags, _, _ = monitor.score(['rex'] * 40, np.zeros(40, dtype=np.intp), later)
+    assert abs(monitor.mean[monitor._rows['rex'], 1] - 38.5) < 0.5
+    assert not flags.any()
+
+
+def test_check_flags_an_outlier():
+    monitor = VitalsMonitor(alpha=ALPHA)
+    rng = np.random.default_rng(5)
+    readings = [{'heart_rate': float(hr), 'temperature': 38.5, 'steps': 5000, 'bark_loudness': 60,
+                 'size': 'Medium', 'age': 4} for hr in rng.normal(100, 5, 50)]
+    monitor.check(['rex'] * 50, readings)
+    alerts = monitor.check(['rex'], [dict(readings[0], heart_rate=400)])
+    assert [alert['vital'] for alert in alerts[0]] == ['heart_rate']
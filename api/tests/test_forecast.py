@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from behaviour_prediction.forecast import (MINUTES_PER_DAY, MINUTES_PER_WEEK, ActivityForecaster, ForecastTables,
+                                          minute_of_week)
+from behaviour_prediction.store import ActivityStore, ActivityStoreWriter
+
+ACTIVITIES = ['Walk', 'Sleep', 'Play']
+
+
+def random_log(n, seed):
+    rng = np.random.default_rng(seed)
+    codes = rng.integers(0, len(ACTIVITIES), n)
+    start_epoch = rng.integers(1_600_000_000, 1_700_000_000, n)
+    duration = rng.integers(1, 240, n)
+    # A few intervals past the end of the week and longer than a week
+    duration[:5] = [MINUTES_PER_WEEK, MINUTES_PER_WEEK + 30, 2 * MINUTES_PER_WEEK + 7, 3 * MINUTES_PER_DAY, 0]
+    pets = rng.integers(0, 4, n)
+    return codes, start_epoch, duration, pets
+
+
+def test_minute_of_week_matches_datetime():
+    epochs = np.random.default_rng(0).integers(0, 2_000_000_000, 500)
+    for epoch, minute in zip(epochs, minute_of_week(epochs)):
+        at = datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+        assert minute == at.weekday() * MINUTES_PER_DAY + at.hour * 60 + at.minute
+
+
+def test_tables_match_painting_each_interval():
+    codes, start_epoch, duration, pets = random_log(400, seed=1)
+    tables = ForecastTables.build(ACTIVITIES, codes, start_epoch, duration, pets)
+
+    occupancy = np.zeros((len(ACTIVITIES), MINUTES_PER_WEEK), dtype=np.int64)
+    starts = np.zeros_like(occupancy)
+    for a, epoch, minutes in zip(codes, start_epoch, duration):
+        start = int(minute_of_week(epoch))
+        np.add.at(occupancy[a], (start + np.arange(max(minutes, 1))) % MINUTES_PER_WEEK, 1)
+        starts[a, start] += 1
+    pet_days = {(pet, epoch // 86400) for pet, epoch in zip(pets, start_epoch)}
+    days = np.bincount([(day + 3) % 7 for _, day in pet_days], minlength=7)
+
+    np.testing.assert_array_equal(tables.occupancy, occupancy)
+    np.testing.assert_array_equal(tables.starts, starts)
+    np.testing.assert_array_equal(tables.days, days)
+
+
+# Minutes after m until the expected starts since m reach the threshold,
+# scanning up to two weeks ahead
+def brute_force_due(tables, a, m, threshold=0.5):
+    rate = tables.starts[a] / np.maximum(np.repeat(tables.days, MINUTES_PER_DAY), 1)
+    ahead = np.cumsum(np.tile(rate, 2)[m + 1:])
+    hits = np.flatnonzero(ahead >= threshold - 1e-9)
+    return int(hits[0]) + 1 if len(hits) else -1
+
+
+def test_due_minutes_match_brute_force():
+    codes, start_epoch, duration, pets = random_log(300, seed=2)
+    # An activity that never starts is never due
+    tables = ForecastTables.build(ACTIVITIES + ['Bath'], codes, start_epoch, duration, pets)
+    minutes = np.random.default_rng(3).integers(0, MINUTES_PER_WEEK, 200)
+    for a in range(len(tables.activities)):
+        for m in minutes:
+            assert tables.due[a, m] == brute_force_due(tables, a, m), (a, m)
+    assert (tables.due[-1] == -1).all()
+
+
+def test_save_and_load(tmp_path):
+    tables = ForecastTables.build(ACTIVITIES, *random_log(50, seed=4))
+    path = str(tmp_path / 'forecast.npz')
+    tables.save(path, {'rows': 50})
+    loaded = ForecastTables.load(path, {'rows': 50})
+    assert loaded.activities == ACTIVITIES
+    for name in ('occupancy', 'starts', 'days', 'due'):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(tables, name))
+    with pytest.raises(ValueError):
+        ForecastTables.load(path, {'rows': 51})
+
+
+def write_store(path, start_date):
+    frame = pd.DataFrame({
+        'pet_name': ['Buddy'] * 3,
+        'activity': ['Walk', 'Sleep', 'Play'],
+        'start_time': pd.date_range(start_date, periods=3, freq='5h'),
+        'duration_minutes': [30, 240, 15],
+    })
+    writer = ActivityStoreWriter(str(path))
+    writer.append(frame)
+    writer.close()
+    return ActivityStore(str(path))
+
+
+# A store regenerated in place with the same row count (generationScript.py
+# records no sources) must not reuse the tables of the old log
+def test_saved_tables_follow_regenerated_store(tmp_path):
+    ActivityForecaster.open(write_store(tmp_path, '2025-05-01'))
+    store = write_store(tmp_path, '2025-05-02')
+    tables = ActivityForecaster.open(store).tables
+    np.testing.assert_array_equal(tables.starts, ForecastTables.from_store(store).starts)
@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+from history import BUCKETS, HistoryStore, telemetry_values
+
+LABELS = ['Happy', 'Sad', 'Calm']
+
+
+def record_all(store, timestamps, heart_rate, steps, calories, emotions):
+    for t, hr, st, cal, e in zip(timestamps, heart_rate, steps, calories, emotions):
+        store.record('rex', {'heart_rate': hr, 'steps': st, 'calories': cal}, LABELS[e], timestamp=t)
+
+
+# What a window holds at `now`: the readings in buckets that end after
+# now - seconds
+def expected_window(seconds, now, timestamps, heart_rate, steps, calories, emotions):
+    width = seconds / BUCKETS
+    oldest = math.floor((now - seconds) / width)
+    inside = np.array([math.floor(t / width) >= oldest for t in timestamps])
+    hr = heart_rate[inside].astype(np.float32).astype(np.float64)
+    counts = np.bincount(emotions[inside], minlength=len(LABELS))
+    return {
+        'count': int(inside.sum()),
+        'mean_heart_rate': round(hr.sum() / len(hr), 2) if len(hr) else None,
+        'max_heart_rate': float(hr.max()) if len(hr) else None,
+        'steps': int(steps[inside].sum()),
+        'calories': round(float(calories[inside].astype(np.float32).astype(np.float64).sum()), 2),
+        'emotions': {label: int(n) for label, n in zip(LABELS, counts) if n},
+    }
+
+
+def random_readings(n, seed):
+    rng = np.random.default_rng(seed)
+    timestamps = np.cumsum(rng.exponential(2.0, n)) + 1_700_000_000
+    return (timestamps, rng.normal(100, 15, n).round(1), rng.integers(0, 50, n),
+            rng.uniform(0, 2, n).round(2), rng.integers(0, len(LABELS), n))
+
+
+def test_windows_are_not_limited_by_the_ring_buffer():
+    store = HistoryStore(LABELS, capacity=256)
+    n = 1000
+    record_all(store, np.arange(n, dtype=float), np.full(n, 100.0), np.ones(n, dtype=int), np.zeros(n),
+               np.zeros(n, dtype=int))
+    summary = store.summary('rex', now=n - 1)
+    assert summary['readings'] == 256
+    for seconds in (600, 3600):
+        count = summary['windows'][f'{seconds}s']['count']
+        assert min(seconds, n) <= count <= min(seconds + seconds // BUCKETS, n)
+        assert summary['windows'][f'{seconds}s']['steps'] == count
+
+
+def test_windows_match_brute_force():
+    readings = random_readings(3000, seed=0)
+    store = HistoryStore(LABELS, capacity=64, windows=(60, 600, 3600))
+    record_all(store, *readings)
+    timestamps = readings[0]
+    for now in (timestamps[-1], timestamps[-1] + 45, timestamps[-1] + 700):
+        windows = store.summary('rex', now=now)['windows']
+        for seconds in (60, 600, 3600):
+            expected = expected_window(seconds, now, *readings)
+            actual = windows[f'{seconds}s']
+            assert actual['count'] == expected['count']
+            assert actual['steps'] == expected['steps']
+            assert actual['emotions'] == expected['emotions']
+            assert actual['max_heart_rate'] == expected['max_heart_rate']
+            assert actual['mean_heart_rate'] == pytest.approx(expected['mean_heart_rate'], abs=0.011)
+            assert actual['calories'] == pytest.approx(expected['calories'], abs=0.011)
+
+
+def test_recent_returns_the_last_readings_in_order():
+    readings = random_readings(300, seed=1)
+    store = HistoryStore(LABELS, capacity=256)
+    record_all(store, *readings)
+    recent = store.summary('rex', limit=5)['recent']
+    assert recent['timestamp'] == readings[0][-5:].tolist()
+    assert recent['steps'] == readings[2][-5:].tolist()
+    assert recent['emotion'] == [LABELS[e] for e in readings[4][-5:]]
+
+
+@pytest.mark.parametrize('reading', [{'steps': 'n/a'}, {'steps': 1.5e10}, {'calories': 'x'},
+                                     {'calories': float('inf')}, {'heart_rate': [1]}])
+def test_bad_telemetry_is_rejected_before_storing(reading):
+    store = HistoryStore(LABELS)
+    with pytest.raises(ValueError):
+        store.record('rex', reading, 'Happy')
+    assert 'rex' not in store
+
+
+def test_missing_and_nan_telemetry_count_as_zero():
+    assert telemetry_values({'heart_rate': float('nan'), 'steps': None}) == (0.0, 0, 0.0)
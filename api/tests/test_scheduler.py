@@ -0,0 +1,46 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from scheduler import InferenceScheduler
+
+
+def double(X):
+    return X * 2
+
+
+def test_lone_row_does_not_wait_for_the_window():
+    scheduler = InferenceScheduler(double, max_wait=1.0)
+    row = np.ones((1, 3), dtype=np.float32)
+    start = time.perf_counter()
+    for _ in range(5):
+        np.testing.assert_array_equal(scheduler.predict(row, timeout=5), [2, 2, 2])
+    assert time.perf_counter() - start < 0.5
+
+
+def test_concurrent_rows_are_batched():
+    scheduler = InferenceScheduler(double, max_batch_size=16, max_wait=0.01)
+    results = {}
+
+    def submit(i):
+        results[i] = scheduler.predict(np.full((1, 2), i, dtype=np.float32), timeout=5)
+
+    for _ in range(5):
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert all((results[i] == 2 * i).all() for i in range(16))
+    assert scheduler.stats()['largest_batch'] > 1
+
+
+def test_closed_scheduler_rejects_rows():
+    scheduler = InferenceScheduler(double)
+    row = np.ones((1, 3), dtype=np.float32)
+    scheduler.predict(row, timeout=5)
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(row)
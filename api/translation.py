@@ -0,0 +1,183 @@
+import csv
+import glob
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+PHRASES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phrases')
+DEFAULT_LOCALE = 'en'
+FALLBACK_PHRASE = "I don't know what to say."
+
+logger = logging.getLogger('pawsense')
+
+
+# Code of a category in `codes`; -1 for unknown values, including anything
+# that is not a string (readings are client JSON and may hold lists or objects)
+def _code(codes, value):
+    return codes.get(value, -1) if isinstance(value, str) else -1
+
+
+# Phrase tables for every locale, built from phrases/<locale>.csv and
+# phrases/aliases.csv. (emotion, activity, context) are mapped to integer
+# codes and each locale has a dense int32 table
+#     table[emotion, activity + 1, context + 1] -> phrase index
+# where index 0 on the activity/context axes means "any". Lookup falls back
+# from (activity, context) to (any activity, context) to (activity, any
+# context), and then to the default locale. A PhraseBook is never mutated;
+# reloading builds a new one.
+class PhraseBook:
+    def __init__(self, directory, default_locale=DEFAULT_LOCALE):
+        self.directory = directory
+        self.default_locale = default_locale
+        self.aliases = {}
+        alias_path = os.path.join(directory, 'aliases.csv')
+        if os.path.exists(alias_path):
+            with open(alias_path, newline='', encoding='utf-8') as f:
+                self.aliases = {row['alias']: row['activity'] for row in csv.DictReader(f)}
+
+        rows = {}
+        for path in sorted(glob.glob(os.path.join(directory, '*.csv'))):
+            locale = os.path.splitext(os.path.basename(path))[0]
+            if locale == 'aliases':
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                rows[locale] = [r for r in csv.DictReader(f) if r.get('emotion') and r.get('phrase')]
+        if default_locale not in rows:
+            raise FileNotFoundError(f"No phrase file for default locale {default_locale!r} in {directory}")
+
+        all_rows = [row for locale_rows in rows.values() for row in locale_rows]
+        self.emotions = self._vocabulary(row['emotion'] for row in all_rows)
+        self.activities = self._vocabulary(row['activity'] for row in all_rows if row['activity'])
+        self.contexts = self._vocabulary(row['context'] for row in all_rows if row.get('context'))
+        self.emotion_codes = {e: i for i, e in enumerate(self.emotions)}
+        self.activity_codes = {a: i for i, a in enumerate(self.activities)}
+        self.activity_codes.update({alias: self.activity_codes[target] for alias, target in self.aliases.items()
+                                    if target in self.activity_codes})
+        self.context_codes = {c: i for i, c in enumerate(self.contexts)}
+
+        self.phrases = {}
+        self.tables = {}
+        shape = (len(self.emotions), len(self.activities) + 1, len(self.contexts) + 1)
+        for locale in [default_locale] + [l for l in rows if l != default_locale]:
+            phrases = [FALLBACK_PHRASE if locale == default_locale else self.phrases[default_locale][0]]
+            table = np.full(shape, -1, dtype=np.int32)
+            for row in rows[locale]:
+                e = self.emotion_codes[row['emotion']]
+                a = self.activity_codes[row['activity']] + 1 if row['activity'] else 0
+                c = self.context_codes[row['context']] + 1 if row.get('context') else 0
+                table[e, a, c] = len(phrases)
+                phrases.append(row['phrase'])
+            if locale != default_locale:
+                # Entries missing from this locale use the default locale's phrase
+                offset = len(phrases)
+                default = self.tables[default_locale]
+                table = np.where((table < 0) & (default >= 0), default + offset, table)
+                phrases.extend(self.phrases[default_locale])
+            self.phrases[locale] = np.array(phrases, dtype=object)
+            self.tables[locale] = table
+
+    @staticmethod
+    def _vocabulary(values):
+        return sorted(set(values))
+
+    @property
+    def locales(self):
+        return list(self.tables)
+
+    def encode(self, emotions, activities, contexts=None):
+        n = len(emotions)
+        e = np.fromiter((_code(self.emotion_codes, x) for x in emotions), dtype=np.int64, count=n)
+        a = np.fromiter((_code(self.activity_codes, x) for x in activities), dtype=np.int64, count=n)
+        if contexts is None:
+            c = np.full(n, -1, dtype=np.int64)
+        else:
+            c = np.fromiter((_code(self.context_codes, x) for x in contexts), dtype=np.int64, count=n)
+        return e, a, c
+
+    # Phrase indices for arrays of codes (-1 = unknown), resolved with the
+    # fallback order described above in a handful of vectorized gathers
+    def lookup_codes(self, emotion_codes, activity_codes, context_codes, locale=None):
+        table = self.tables.get(locale or self.default_locale, self.tables[self.default_locale])
+        known = emotion_codes >= 0
+        e = np.where(known, emotion_codes, 0)
+        a = activity_codes + 1
+        c = context_codes + 1
+        index = table[e, a, c]
+        index = np.where(index < 0, table[e, 0, c], index)
+        index = np.where(index < 0, table[e, a, 0], index)
+        return np.where(known & (index >= 0), index, 0)
+
+    def translate_many(self, emotions, activities, contexts=None, locale=None):
+        locale = locale if isinstance(locale, str) and locale in self.tables else self.default_locale
+        index = self.lookup_codes(*self.encode(emotions, activities, contexts), locale=locale)
+        return self.phrases[locale][index].tolist()
+
+    # Scalar version of translate_many for single readings, without the array setup
+    def translate(self, emotion, activity, context=None, locale=None):
+        locale = locale if isinstance(locale, str) and locale in self.tables else self.default_locale
+        e = _code(self.emotion_codes, emotion)
+        if e < 0:
+            return self.phrases[locale][0]
+        table = self.tables[locale]
+        a = _code(self.activity_codes, activity) + 1
+        c = _code(self.context_codes, context) + 1
+        for index in (table[e, a, c], table[e, 0, c], table[e, a, 0]):
+            if index >= 0:
+                return self.phrases[locale][index]
+        return self.phrases[locale][0]
+
+
+# Holds the current PhraseBook and swaps in a new one when the phrase files
+# change on disk (checked at most every `check_interval` seconds) or when
+# reload() is called. Readers always see a complete book.
+class TranslationEngine:
+    def __init__(self, directory=PHRASES_DIR, default_locale=DEFAULT_LOCALE, check_interval=5.0):
+        self.directory = directory
+        self.default_locale = default_locale
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._signature = self._files_signature()
+        self.book = PhraseBook(directory, default_locale)
+
+    def _files_signature(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, '*.csv')))
+        return tuple((path, os.path.getmtime(path)) for path in paths)
+
+    def reload(self):
+        with self._lock:
+            signature = self._files_signature()
+            self.book = PhraseBook(self.directory, self.default_locale)
+            self._signature = signature
+        return self.book
+
+    def refresh_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        signature = self._files_signature()
+        if signature == self._signature:
+            return False
+        try:
+            self.reload()
+        except (OSError, ValueError, KeyError, csv.Error) as e:
+            # Keep serving the previous phrases until the files are fixed
+            self._signature = signature
+            logger.warning("Could not reload phrases from %s: %s", self.directory, e)
+            return False
+        return True
+
+    def current(self):
+        if self.check_interval is not None:
+            self.refresh_if_changed()
+        return self.book
+
+    def translate(self, emotion, activity, context=None, locale=None):
+        return self.current().translate(emotion, activity, context, locale)
+
+    def translate_many(self, emotions, activities, contexts=None, locale=None):
+        return self.current().translate_many(emotions, activities, contexts, locale)
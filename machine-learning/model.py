@@ -1,89 +1,240 @@
 #import necessary libraries
-import pandas as pd
+import argparse
+import hashlib
+import json
 import os
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.preprocessing import LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
 import xgboost as xgb
+from joblib import Parallel, delayed
 from sklearn.metrics import accuracy_score, classification_report
-from tensorflow.python.keras.callbacks import EarlyStopping
-import joblib
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import LabelEncoder
 
-# Load the dataset
-filepath = "C:\\Users\\nabil\\OneDrive\\Desktop\\Smart Collar for Dogs\\Dataset for emotion detection\\dog_emotion_dataset_140k.csv"
-df = pd.read_csv(filepath)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.environ.get(
+    'PAWSENSE_TRAINING_DATA',
+    "C:\\Users\\nabil\\OneDrive\\Desktop\\Smart Collar for Dogs\\Dataset for emotion detection\\dog_emotion_dataset_140k.csv")
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
+CACHE_VERSION = 1
+MANIFEST_NAME = 'model_manifest.json'
 
-# Preprocess the dataset
 categorical_features = ['size', 'tail_position', 'tail_stiffness', 'wag_direction']
-label_encoders = {}
-
-# Convert categorical features to numerical using Label Encoding and have a separate encoder for each feature
-for col in categorical_features:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col])  # fit on training data
-    label_encoders[col] = le
-
-# Label encoding for 'emotion' target column
-target_le = LabelEncoder()
-
-target_le.fit(df['emotion'])
-df['emotion'] = target_le.transform(df['emotion'])
-
-# Split the dataset into features and target variable
-X = df.drop(columns=['emotion', 'context'])
-y = df['emotion']
-
-# Split the dataset into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=100, stratify=y)
-
-# Train a XGBoost model
-model = xgb.XGBClassifier(n_estimators=1000, max_depth=5, learning_rate=0.1, random_state=42)
-
-model.fit(X_train, y_train)
-
-# Evaluate the model using cross-validation and accuracy score
-scores = cross_val_score(model, X, y, cv=5, scoring='accuracy')
-print("CV Accuracy: %.2f%% +/- %.2f%%" % (scores.mean()*100, scores.std()*100))
-
-# Evaluate the model on the test set
-y_pred = model.predict(X_test)
-accuracy = accuracy_score(y_test, y_pred)
-print(f"Accuracy: {accuracy * 100:.2f}%")
-print("Classification Report:")
-print(classification_report(y_test, y_pred, target_names=target_le.classes_))
-
-# Test the model with new data
-new_data = pd.DataFrame([
-    {
-        'size': 'Small',
-        'age': 8,
-        'heart_rate': 93,
-        'tail_wag_speed': 0.49,
-        'tail_wag_amplitude': 53,
-        'tail_position': 'Neutral',
-        'tail_stiffness': 'Loose',
-        'wag_direction': 'Neutral',
-        'bark_pitch': 400,
-        'bark_loudness': 70,
-        'bark_duration': 0.43,
-        'head_tilt': 0,
+target = 'emotion'
+dropped_columns = ['context']
+numeric_features = ['age', 'heart_rate', 'tail_wag_speed', 'tail_wag_amplitude',
+                    'bark_pitch', 'bark_loudness', 'bark_duration', 'head_tilt']
+csv_dtypes = {**{col: 'category' for col in categorical_features + dropped_columns + [target]},
+              **{col: np.float32 for col in numeric_features}}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the PawSense dog emotion classifier")
+    parser.add_argument('--data', default=DEFAULT_DATA, help="path to the emotion dataset CSV")
+    parser.add_argument('--output-dir', default=BASE_DIR, help="where model.joblib and the encoders are written")
+    parser.add_argument('--no-cache', action='store_true', help="ignore and don't write the encoded dataset cache")
+    parser.add_argument('--cv-folds', type=int, default=5, help="cross-validation folds, 0 to skip")
+    parser.add_argument('--n-jobs', type=int, default=os.cpu_count() or 1, help="CPU cores to use")
+    parser.add_argument('--n-estimators', type=int, default=1000)
+    parser.add_argument('--max-depth', type=int, default=5)
+    parser.add_argument('--learning-rate', type=float, default=0.1)
+    parser.add_argument('--early-stopping-rounds', type=int, default=50)
+    parser.add_argument('--validation-size', type=float, default=0.1,
+                        help="share of the training split held out for early stopping")
+    parser.add_argument('--native-format', choices=['ubj', 'json', 'none'], default='ubj',
+                        help="also export the booster in XGBoost's own format, with model_manifest.json")
+    return parser.parse_args(argv)
+
+
+# Reads the CSV in one pass with compact dtypes (categories and float32), so
+# the frame is only ever held once; reading in chunks and concatenating them
+# needs twice its size at the peak
+def load_dataset(path):
+    return pd.read_csv(path, dtype=csv_dtypes)
+
+
+# Label-encodes the categorical features and the target straight from the
+# categorical codes, with one LabelEncoder per column as the API expects
+def encode_dataset(df):
+    for col in categorical_features + [target]:
+        if (df[col].cat.codes < 0).any():
+            raise ValueError(f"Column {col} has missing values")
+    label_encoders = {}
+    for col in categorical_features:
+        le = LabelEncoder().fit(df[col].cat.categories)
+        df[col] = le.transform(df[col].cat.categories)[df[col].cat.codes]
+        label_encoders[col] = le
+    target_le = LabelEncoder().fit(df[target].cat.categories)
+    y = target_le.transform(df[target].cat.categories)[df[target].cat.codes]
+    X = df.drop(columns=[target] + [c for c in dropped_columns if c in df.columns])
+    return X.astype(np.float32), y, label_encoders, target_le
+
+
+def cache_path(data_path):
+    stat = os.stat(data_path)
+    key = f"{os.path.abspath(data_path)}:{stat.st_size}:{stat.st_mtime_ns}:{CACHE_VERSION}"
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(CACHE_DIR, f"{name}-{hashlib.sha1(key.encode()).hexdigest()[:12]}.npz")
+
+
+def save_cache(path, X, y, label_encoders, target_le):
+    arrays = {'X': X.to_numpy(), 'y': y, 'features': np.array(X.columns),
+              'target_classes': target_le.classes_}
+    for col, le in label_encoders.items():
+        arrays[f'classes_{col}'] = le.classes_
+    atomic_write(path, lambda f: np.savez(f, **arrays))
+
+
+def load_cache(path):
+    with np.load(path, allow_pickle=True) as cache:
+        X = pd.DataFrame(cache['X'], columns=list(cache['features']))
+        label_encoders = {}
+        for col in categorical_features:
+            le = LabelEncoder()
+            le.classes_ = cache[f'classes_{col}']
+            label_encoders[col] = le
+        target_le = LabelEncoder()
+        target_le.classes_ = cache['target_classes']
+        return X, cache['y'], label_encoders, target_le
+
+
+def prepare_dataset(args):
+    path = None if args.no_cache else cache_path(args.data)
+    if path and os.path.exists(path):
+        print(f"Using cached dataset {path}")
+        return load_cache(path)
+    start = time.perf_counter()
+    X, y, label_encoders, target_le = encode_dataset(load_dataset(args.data))
+    print(f"Loaded and encoded {len(X)} rows in {time.perf_counter() - start:.1f}s")
+    if path:
+        save_cache(path, X, y, label_encoders, target_le)
+    return X, y, label_encoders, target_le
+
+
+def build_model(args, n_jobs):
+    return xgb.XGBClassifier(n_estimators=args.n_estimators, max_depth=args.max_depth,
+                             learning_rate=args.learning_rate, random_state=42, tree_method='hist',
+                             early_stopping_rounds=args.early_stopping_rounds, n_jobs=n_jobs)
+
+
+# Fits with early stopping on a stratified validation split carved out of the training rows
+def fit_with_early_stopping(args, X_train, y_train, n_jobs):
+    X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=args.validation_size,
+                                                  random_state=42, stratify=y_train)
+    model = build_model(args, n_jobs)
+    model.fit(X_fit, y_fit, eval_set=[(X_val, y_val)], verbose=False)
+    return model
+
+
+def score_fold(args, X, y, train_index, test_index, n_jobs):
+    model = fit_with_early_stopping(args, X.iloc[train_index], y[train_index], n_jobs)
+    return accuracy_score(y[test_index], model.predict(X.iloc[test_index]))
+
+
+# Runs the CV folds in parallel processes, splitting the cores between them
+def cross_validate(args, X, y):
+    folds = StratifiedKFold(n_splits=args.cv_folds, shuffle=True, random_state=42).split(X, y)
+    workers = min(args.cv_folds, args.n_jobs)
+    threads_per_fold = max(1, args.n_jobs // workers)
+    return np.array(Parallel(n_jobs=workers)(
+        delayed(score_fold)(args, X, y, train_index, test_index, threads_per_fold)
+        for train_index, test_index in folds))
+
+
+# Mode of a newly created file under the current umask (mkstemp uses 0600)
+def default_file_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# Writes through a temporary file in the same directory and renames it into
+# place, so a running API never loads a half-written artifact. The file gets
+# the permissions a plain open() would give it, so an API running as another
+# user can still read it.
+def atomic_write(path, write):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        os.fchmod(fd, default_file_mode())
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Writes the booster in XGBoost's native format (model.ubj or model.json) and
+# a manifest with everything the API needs to serve it without unpickling:
+# feature order, category codes, class labels and the trees to use
+def export_native(output_dir, model, label_encoders, target_le, fmt='ubj'):
+    booster = model.get_booster()
+    model_file = f'model.{fmt}'
+    raw = booster.save_raw(raw_format=fmt)
+    atomic_write(os.path.join(output_dir, model_file), lambda f: f.write(raw))
+    best_iteration = getattr(model, 'best_iteration', None)
+    manifest = {
+        'format': fmt,
+        'model_file': model_file,
+        'sha256': hashlib.sha256(raw).hexdigest(),
+        'features': [str(f) for f in model.feature_names_in_],
+        'categories': {col: [str(c) for c in le.classes_] for col, le in label_encoders.items()},
+        'classes': [str(c) for c in target_le.classes_],
+        'objective': model.get_params()['objective'],
+        'iteration_range': [0, int(best_iteration) + 1] if best_iteration is not None else None,
+        'xgboost_version': xgb.__version__,
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
     }
-])
+    atomic_write(os.path.join(output_dir, MANIFEST_NAME),
+                 lambda f: f.write(json.dumps(manifest, indent=2).encode()))
 
-# Encode categorical features with the same label encoders used in training
-for col in categorical_features:
-    new_data[col] = target_le.inverse_transform(new_data[col]) if col == 'emotion' else label_encoders[col].transform(new_data[col])
-    print(f"Encoded {col}: {new_data[col].values}")
 
-print(new_data)
-predicted_label_num = model.predict(new_data)[0]
-print("Predicted label number:", predicted_label_num)
-predicted_emotion = target_le.inverse_transform([predicted_label_num])[0]
-print("Predicted dog emotion:", predicted_emotion)
+def save_artifacts(output_dir, model, label_encoders, target_le, native_format='ubj'):
+    for name, obj in [('model.joblib', model), ('label_encoders.joblib', label_encoders),
+                      ('target_le.joblib', target_le)]:
+        atomic_write(os.path.join(output_dir, name), lambda f, obj=obj: joblib.dump(obj, f))
+    # Written last: the API switches to a new model when its manifest changes
+    if native_format != 'none':
+        export_native(output_dir, model, label_encoders, target_le, native_format)
+    elif os.path.exists(os.path.join(output_dir, MANIFEST_NAME)):
+        # Otherwise the API would keep serving the previous native export
+        os.remove(os.path.join(output_dir, MANIFEST_NAME))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    X, y, label_encoders, target_le = prepare_dataset(args)
+
+    # Split the dataset into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=100, stratify=y)
+
+    if args.cv_folds > 1:
+        start = time.perf_counter()
+        scores = cross_validate(args, X_train, y_train)
+        print("CV Accuracy: %.2f%% +/- %.2f%% (%.1fs)" % (scores.mean()*100, scores.std()*100,
+                                                           time.perf_counter() - start))
+
+    start = time.perf_counter()
+    model = fit_with_early_stopping(args, X_train, y_train, args.n_jobs)
+    print(f"Trained {model.best_iteration + 1} trees in {time.perf_counter() - start:.1f}s")
+
+    # Evaluate the model on the test set
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"Accuracy: {accuracy * 100:.2f}%")
+    print("Classification Report:")
+    print(classification_report(y_test, y_pred, target_names=target_le.classes_))
+
+    # Save the model and encoders
+    save_artifacts(args.output_dir, model, label_encoders, target_le, args.native_format)
+    print(f"Saved model and encoders to {args.output_dir}")
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Save the model and encoders
-joblib.dump(model, os.path.join(BASE_DIR,"model.joblib"))
-joblib.dump(label_encoders, os.path.join(BASE_DIR, "label_encoders.joblib"))
-joblib.dump(target_le, os.path.join(BASE_DIR,"target_le.joblib"))
\ No newline at end of file
+if __name__ == '__main__':
+    main()